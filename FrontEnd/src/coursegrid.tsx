@@ -2,6 +2,7 @@
 import { css } from '@emotion/react';
 import React, { useState, useEffect } from 'react';
 import { useNavigate } from 'react-router-dom';
+import { fetchAllPages } from './fetchAllPages';
 
 interface Course {
   id: number;
@@ -13,6 +14,7 @@ interface Course {
   end_date: string;
   teacher_id: number;
   video_url: string;
+  teacher?: Teacher;
 }
 
 interface Teacher {
@@ -20,7 +22,7 @@ interface Teacher {
   name: string;
 }
 
-const CourseCard: React.FC<{ course: Course; teacher: Teacher | null }> = ({ course, teacher }) => {
+const CourseCard: React.FC<{ course: Course }> = ({ course }) => {
   const navigate = useNavigate();
 
   const getYoutubeVideoId = (url: string) => {
@@ -66,7 +68,7 @@ const CourseCard: React.FC<{ course: Course; teacher: Teacher | null }> = ({ cou
       <p><strong>Category:</strong> {course.category}</p>
       <p><strong>Start Date:</strong> {new Date(course.start_date).toLocaleDateString()}</p>
       <p><strong>End Date:</strong> {new Date(course.end_date).toLocaleDateString()}</p>
-      <p><strong>Teacher:</strong> {teacher ? teacher.name : 'Loading...'}</p>
+      <p><strong>Teacher:</strong> {course.teacher ? course.teacher.name : 'Unknown'}</p>
     </div>
   );
 };
@@ -74,7 +76,6 @@ const CourseCard: React.FC<{ course: Course; teacher: Teacher | null }> = ({ cou
 const CoursesGrid: React.FC = () => {
   const [courses, setCourses] = useState<Course[]>([]);
   const [filteredCourses, setFilteredCourses] = useState<Course[]>([]);
-  const [teachers, setTeachers] = useState<{ [key: number]: Teacher }>({});
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
   const [searchTerm, setSearchTerm] = useState('');
@@ -82,32 +83,15 @@ const CoursesGrid: React.FC = () => {
   useEffect(() => {
     const fetchCourses = async () => {
       try {
-        const response = await fetch('http://localhost:8000/course/', {
+        // the teachers come embedded in the same pages, no request per teacher
+        const data = await fetchAllPages<Course>('http://localhost:8000/course/?expand=teacher', {
           headers: {
             'Authorization': `Bearer ${localStorage.getItem('token')}`
           }
         });
-
-        if (!response.ok) {
-          throw new Error('Failed to fetch courses');
-        }
-
-        const data: Course[] = await response.json();
         setCourses(data);
         setFilteredCourses(data);
         setLoading(false);
-
-        // Fetch teacher information for each course
-        const teacherIds = [...new Set(data.map(course => course.teacher_id))];
-        const teacherPromises = teacherIds.map(id => fetchTeacher(id));
-        const teacherResults = await Promise.all(teacherPromises);
-        const teacherMap = teacherResults.reduce((acc, teacher) => {
-          if (teacher) {
-            acc[teacher.id] = teacher;
-          }
-          return acc;
-        }, {} as { [key: number]: Teacher });
-        setTeachers(teacherMap);
       } catch (err) {
         setError('Failed to fetch courses. Please try again later.');
         setLoading(false);
@@ -117,26 +101,6 @@ const CoursesGrid: React.FC = () => {
     fetchCourses();
   }, []);
 
-  const fetchTeacher = async (teacherId: number): Promise<Teacher | null> => {
-    try {
-      const response = await fetch(`http://localhost:8000/user/${teacherId}`, {
-        headers: {
-          'Authorization': `Bearer ${localStorage.getItem('token')}`
-        }
-      });
-
-      if (!response.ok) {
-        throw new Error('Failed to fetch teacher');
-      }
-
-      const data = await response.json();
-      return { id: data.id, name: data.name };
-    } catch (err) {
-      console.error(`Failed to fetch teacher with ID ${teacherId}:`, err);
-      return null;
-    }
-  };
-
   useEffect(() => {
     const filtered = courses.filter(course =>
       course.title.toLowerCase().includes(searchTerm.toLowerCase())
@@ -201,7 +165,7 @@ const CoursesGrid: React.FC = () => {
         justifyContent: 'center',
       }}>
         {filteredCourses.map((course) => (
-          <CourseCard key={course.id} course={course} teacher={teachers[course.teacher_id] || null} />
+          <CourseCard key={course.id} course={course} />
         ))}
       </div>
       {filteredCourses.length === 0 && (
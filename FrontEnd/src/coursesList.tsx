@@ -1,4 +1,5 @@
 import React, { useEffect, useState } from 'react';
+import { fetchAllPages } from './fetchAllPages';
 
 interface Course {
   id: number;
@@ -61,19 +62,13 @@ const CoursesList: React.FC = () => {
   useEffect(() => {
     const fetchCourses = async () => {
       try {
-        const response = await fetch('http://localhost:8000/course/', {
+        const data = await fetchAllPages<Course>('http://localhost:8000/course/', {
           method: 'GET',
           headers: {
             'Content-Type': 'application/json',
             'Authorization': `Bearer ${localStorage.getItem('token')}`,
           },
         });
-
-        if (!response.ok) {
-          throw new Error('Error al cargar los cursos');
-        }
-
-        const data = await response.json();
         setCourses(data);
         setFilteredCourses(data);
       } catch (error: any) {
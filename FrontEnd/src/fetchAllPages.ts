@@ -0,0 +1,21 @@
+// List endpoints such as /course/ return one page at a time and put the
+// cursor of the next page in the X-Next-Cursor header; this follows it until
+// the last page and returns every item.
+export const fetchAllPages = async <T>(url: string, init: RequestInit = {}, pageSize = 200): Promise<T[]> => {
+  const items: T[] = [];
+  let cursor: string | null = null;
+  do {
+    const pageUrl = new URL(url);
+    pageUrl.searchParams.set('limit', String(pageSize));
+    if (cursor) {
+      pageUrl.searchParams.set('after', cursor);
+    }
+    const response = await fetch(pageUrl, init);
+    if (!response.ok) {
+      throw new Error(`Request to ${url} failed with status ${response.status}`);
+    }
+    items.push(...(await response.json()) as T[]);
+    cursor = response.headers.get('X-Next-Cursor');
+  } while (cursor);
+  return items;
+};
@@ -1,6 +1,5 @@
 import React, { useEffect, useState } from 'react';
 import { Link, useNavigate } from 'react-router-dom';
-import { jwtDecode } from 'jwt-decode';
 
 interface Course {
   id: number;
@@ -8,8 +7,10 @@ interface Course {
   description: string;
 }
 
-interface DecodedToken {
-  id: number;
+interface Dashboard {
+  courses: Course[] | null;
+  enrolled_count: number;
+  recommendations: Course[];
 }
 
 const Home: React.FC = () => {
@@ -27,57 +28,16 @@ const Home: React.FC = () => {
 
 
   useEffect(() => {
-    // Decodificar el token y obtener user_id
     const token = localStorage.getItem('token');
     if (!token) {
       setError("No authentication token found");
       return;
     }
-    
-    const decodedToken = jwtDecode<DecodedToken>(token);
-    const userId = decodedToken.id;
-
-    const fetchCourses = async () => {
-      try {
-        const response = await fetch('http://localhost:8000/course/', {
-          method: 'GET',
-          headers: {
-            'Content-Type': 'application/json',
-            'Authorization': `Bearer ${token}`,
-          },
-        });
-
-        if (!response.ok) throw new Error('Failed to fetch courses');
-
-        const courses: Course[] = await response.json();
-        setFeaturedCourses(courses.slice(0, 3));
-      } catch (err: any) {
-        setError(err.message);
-      }
-    };
-
-    const fetchUserCoursesCount = async () => {
-      try {
-        const response = await fetch(`http://localhost:8000/userCourse/my-courses/${userId}`, {
-          method: 'GET',
-          headers: {
-            'Content-Type': 'application/json',
-            'Authorization': `Bearer ${token}`,
-          },
-        });
-
-        if (!response.ok) throw new Error('Failed to fetch user courses count');
-
-        const coursesCount: number = await response.json();
-        setUserCoursesCount(coursesCount);
-      } catch (err: any) {
-        setError(err.message);
-      }
-    };
 
-    const fetchRecommendedCourses = async () => {
+    // catalog page, enrolled count and recommendations in a single round trip
+    const fetchDashboard = async () => {
       try {
-        const response = await fetch('http://localhost:8000/course/random-courses/', {
+        const response = await fetch('http://localhost:8000/dashboard/?limit=3', {
           method: 'GET',
           headers: {
             'Content-Type': 'application/json',
@@ -85,27 +45,19 @@ const Home: React.FC = () => {
           },
         });
 
-        if (!response.ok) throw new Error('Failed to fetch recommended courses');
+        if (!response.ok) throw new Error('Failed to fetch dashboard');
 
-        const courses: Course[] = await response.json();
-        setRecommendedCourses(courses); 
+        const dashboard: Dashboard = await response.json();
+        // courses is left out for the roles that can't list the catalog
+        setFeaturedCourses((dashboard.courses ?? []).slice(0, 3));
+        setUserCoursesCount(dashboard.enrolled_count);
+        setRecommendedCourses(dashboard.recommendations);
       } catch (err: any) {
         setError(err.message);
       }
     };
 
-
-
-
-
-
-
-
-
-
-    fetchCourses();
-    fetchUserCoursesCount();
-    fetchRecommendedCourses();
+    fetchDashboard();
   }, []);
 
   return (
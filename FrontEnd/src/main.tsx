@@ -2,9 +2,12 @@
 import React from 'react'
 import ReactDOM from 'react-dom/client'
 import App from './App'
+import { installReadYourWrites } from './readYourWrites'
 import './index.css'
 import 'bootstrap/dist/css/bootstrap.min.css'
 
+installReadYourWrites()
+
 ReactDOM.createRoot(document.getElementById('root') as HTMLElement).render(
   <React.StrictMode>
     <App />
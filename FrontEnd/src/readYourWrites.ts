@@ -0,0 +1,29 @@
+// After a write the api answers with X-Read-Primary-Until. Sending it back on
+// the following requests keeps this user's reads on the primary database until
+// the replica caught up, whichever api worker serves them. It is kept in
+// sessionStorage so it survives the reload after the Stripe redirect.
+const API_ORIGIN = 'http://localhost:8000';
+const PRIMARY_PIN_HEADER = 'X-Read-Primary-Until';
+
+export const installReadYourWrites = () => {
+  const fetchUnpinned = window.fetch.bind(window);
+
+  window.fetch = async (input: RequestInfo | URL, init: RequestInit = {}) => {
+    const url = new URL(input instanceof Request ? input.url : String(input), window.location.href);
+    if (url.origin !== API_ORIGIN) {
+      return fetchUnpinned(input, init);
+    }
+    const headers = new Headers(init.headers ?? (input instanceof Request ? input.headers : undefined));
+    const pinnedUntil = sessionStorage.getItem(PRIMARY_PIN_HEADER);
+    // the api compares it with its own clock, an expired one is ignored
+    if (pinnedUntil) {
+      headers.set(PRIMARY_PIN_HEADER, pinnedUntil);
+    }
+    const response = await fetchUnpinned(input, { ...init, headers });
+    const pin = response.headers.get(PRIMARY_PIN_HEADER);
+    if (pin) {
+      sessionStorage.setItem(PRIMARY_PIN_HEADER, pin);
+    }
+    return response;
+  };
+};
@@ -23,8 +23,12 @@ if config.config_file_name is not None:
 # MODEL IMPORTS:
 from model.user import User
 from model.course import Course
-from model.payment import Payment
+from model.payment import Payment, PaymentArchive
 from model.userCourse import UserCourse
+from model.idempotencyKey import IdempotencyKey
+from model.stripeEvent import StripeEvent
+from model.outbox import OutboxMessage
+from model.dailyStats import CourseDailyStats, TeacherDailyStats
 target_metadata = base.metadata
 
 # other values from the config, defined by the needs of env.py,
@@ -0,0 +1,41 @@
+"""index hot lookup columns
+
+Revision ID: 1eb5be10c69c
+Revises: e091fb70fbf9
+Create Date: 2026-10-18 12:20:05.631877
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1eb5be10c69c'
+down_revision: Union[str, None] = 'e091fb70fbf9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# courses.teacher_id and courses.category are already led by the keyset
+# indexes of 9fb39b836a13, so they are not indexed again here.
+INDEXES = [
+    ('ix_payment_user_id', 'payment', ['user_id']),
+    ('ix_payment_course_id', 'payment', ['course_id']),
+    ('ix_users_name', 'users', ['name']),
+    ('ix_users_email', 'users', ['email']),
+    ('ix_usercourse_course_id', 'usercourse', ['course_id']),
+]
+
+
+def upgrade() -> None:
+    # CONCURRENTLY can't run inside the migration transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
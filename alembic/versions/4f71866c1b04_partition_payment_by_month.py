@@ -0,0 +1,207 @@
+"""partition payment by month
+
+Revision ID: 4f71866c1b04
+Revises: 03a01518361f
+Create Date: 2026-10-18 17:48:21.530118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4f71866c1b04'
+down_revision: Union[str, None] = '03a01518361f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# months of partitions created ahead of the current one
+MONTHS_AHEAD = 3
+
+INDEXES = [
+    ('ix_payment_user_id_payment_date_id', ['user_id', 'payment_date', 'id']),
+    ('ix_payment_course_id_payment_date_id', ['course_id', 'payment_date', 'id']),
+    ('ix_payment_payment_date_id', ['payment_date', 'id']),
+]
+
+COLUMNS = "id, user_id, course_id, amount, payment_date, payment_method, status, stripe_payment_intent_id"
+
+
+def create_triggers() -> None:
+    op.execute("""
+    CREATE TRIGGER trigger_enroll_on_payment_insert
+    AFTER INSERT ON payment
+    REFERENCING NEW TABLE AS new_payments
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION enroll_completed_payments_on_insert();
+    """)
+    op.execute("""
+    CREATE TRIGGER trigger_enroll_on_payment_update
+    AFTER UPDATE ON payment
+    REFERENCING OLD TABLE AS old_payments NEW TABLE AS new_payments
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION enroll_completed_payments_on_update();
+    """)
+
+
+def drop_triggers() -> None:
+    op.execute("DROP TRIGGER IF EXISTS trigger_enroll_on_payment_update ON payment;")
+    op.execute("DROP TRIGGER IF EXISTS trigger_enroll_on_payment_insert ON payment;")
+
+
+def upgrade() -> None:
+    # the copy below is done under an exclusive lock; run it in a maintenance window
+    op.execute("LOCK TABLE payment IN ACCESS EXCLUSIVE MODE")
+    drop_triggers()
+    op.execute("ALTER TABLE payment RENAME TO payment_unpartitioned")
+    op.execute("ALTER TABLE payment_unpartitioned RENAME CONSTRAINT payment_pkey TO payment_unpartitioned_pkey")
+    for name, columns in INDEXES:
+        op.drop_index(name, table_name='payment_unpartitioned')
+
+    # the partition key has to be part of the primary key, and can't be null;
+    # stripe intent ids can only be unique per partition, so that one is a plain index now
+    op.execute("""
+    CREATE TABLE payment (
+        id integer NOT NULL DEFAULT nextval('payment_id_seq'),
+        user_id integer REFERENCES users (id),
+        course_id integer REFERENCES courses (id),
+        amount double precision NOT NULL,
+        payment_date timestamp without time zone NOT NULL DEFAULT localtimestamp,
+        payment_method paymentmethod,
+        status paymentstatus,
+        stripe_payment_intent_id varchar,
+        PRIMARY KEY (id, payment_date)
+    ) PARTITION BY RANGE (payment_date)
+    """)
+    op.execute("ALTER SEQUENCE payment_id_seq OWNED BY payment.id")
+    # catches rows outside the created months so an insert never fails;
+    # create_payment_partitions moves them out when their month is created
+    op.execute("CREATE TABLE payment_default PARTITION OF payment DEFAULT")
+
+    op.execute("""
+    CREATE OR REPLACE FUNCTION create_payment_partitions(start_at timestamp, months_ahead integer)
+    RETURNS integer AS $$
+    DECLARE
+        month_start timestamp;
+        partition_name text;
+        created integer := 0;
+    BEGIN
+        -- every app process runs this; one at a time so they don't race on CREATE TABLE
+        PERFORM pg_advisory_xact_lock(hashtext('create_payment_partitions'));
+        FOR month_start IN
+            SELECT generate_series(date_trunc('month', least(start_at, localtimestamp)),
+                                   date_trunc('month', localtimestamp) + make_interval(months => months_ahead),
+                                   interval '1 month')
+        LOOP
+            partition_name := 'payment_p' || to_char(month_start, 'YYYY_MM');
+            CONTINUE WHEN to_regclass(partition_name) IS NOT NULL;
+            EXECUTE format('CREATE TABLE %I (LIKE payment INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', partition_name);
+            EXECUTE format('WITH moved AS (DELETE FROM payment_default WHERE payment_date >= %L AND payment_date < %L RETURNING *) '
+                           'INSERT INTO %I SELECT * FROM moved',
+                           month_start, month_start + interval '1 month', partition_name);
+            EXECUTE format('ALTER TABLE payment ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                           partition_name, month_start, month_start + interval '1 month');
+            created := created + 1;
+        END LOOP;
+        RETURN created;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+    op.execute(f"""
+    SELECT create_payment_partitions(
+        coalesce((SELECT min(payment_date) FROM payment_unpartitioned), localtimestamp), {MONTHS_AHEAD})
+    """)
+
+    op.execute(f"""
+    INSERT INTO payment ({COLUMNS})
+    SELECT id, user_id, course_id, amount, coalesce(payment_date, localtimestamp), payment_method, status, stripe_payment_intent_id
+    FROM payment_unpartitioned
+    """)
+    op.drop_table('payment_unpartitioned')
+    for name, columns in INDEXES:
+        op.create_index(name, 'payment', columns, unique=False)
+    op.create_index('ix_payment_stripe_payment_intent_id', 'payment', ['stripe_payment_intent_id'], unique=False)
+    # transition tables on the partitioned parent see the rows of every partition
+    create_triggers()
+
+    op.create_table('payment_archive',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('course_id', sa.Integer(), nullable=True),
+    sa.Column('amount', sa.Float(), nullable=False),
+    sa.Column('payment_date', sa.DateTime(), nullable=False),
+    sa.Column('payment_method', postgresql.ENUM('stripe', 'paypal', name='paymentmethod', create_type=False), nullable=True),
+    sa.Column('status', postgresql.ENUM('pending', 'completed', 'failed', name='paymentstatus', create_type=False), nullable=True),
+    sa.Column('stripe_payment_intent_id', sa.String(), nullable=True),
+    sa.Column('archived_at', sa.DateTime(), server_default=sa.text('localtimestamp'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_payment_archive_user_id', 'payment_archive', ['user_id'], unique=False)
+
+    # move one chunk of stale pending/failed payments to payment_archive; returns how many moved
+    op.execute(f"""
+    CREATE OR REPLACE FUNCTION archive_stale_payments(older_than interval, chunk_size integer)
+    RETURNS integer AS $$
+    DECLARE
+        moved_count integer;
+    BEGIN
+        WITH stale AS (
+            SELECT id, payment_date FROM payment
+            WHERE status IN ('pending', 'failed') AND payment_date < localtimestamp - older_than
+            ORDER BY payment_date
+            LIMIT chunk_size
+            FOR UPDATE SKIP LOCKED
+        ), moved AS (
+            DELETE FROM payment p USING stale s
+            WHERE p.id = s.id AND p.payment_date = s.payment_date
+            RETURNING p.*
+        )
+        INSERT INTO payment_archive ({COLUMNS})
+        SELECT {COLUMNS} FROM moved;
+        GET DIAGNOSTICS moved_count = ROW_COUNT;
+        RETURN moved_count;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP FUNCTION IF EXISTS archive_stale_payments;")
+    op.execute("LOCK TABLE payment IN ACCESS EXCLUSIVE MODE")
+    drop_triggers()
+    op.execute("ALTER TABLE payment RENAME TO payment_partitioned")
+    op.execute("ALTER TABLE payment_partitioned RENAME CONSTRAINT payment_pkey TO payment_partitioned_pkey")
+    op.drop_index('ix_payment_stripe_payment_intent_id', table_name='payment_partitioned')
+    for name, columns in INDEXES:
+        op.drop_index(name, table_name='payment_partitioned')
+
+    op.execute("""
+    CREATE TABLE payment (
+        id integer NOT NULL DEFAULT nextval('payment_id_seq') PRIMARY KEY,
+        user_id integer REFERENCES users (id),
+        course_id integer REFERENCES courses (id),
+        amount double precision NOT NULL,
+        payment_date timestamp without time zone,
+        payment_method paymentmethod,
+        status paymentstatus,
+        stripe_payment_intent_id varchar CONSTRAINT payment_stripe_payment_intent_id_key UNIQUE
+    )
+    """)
+    op.execute("ALTER SEQUENCE payment_id_seq OWNED BY payment.id")
+    # archived rows go back too, nothing is lost by downgrading
+    op.execute(f"""
+    INSERT INTO payment ({COLUMNS})
+    SELECT {COLUMNS} FROM payment_partitioned
+    UNION ALL
+    SELECT {COLUMNS} FROM payment_archive
+    """)
+    op.drop_table('payment_partitioned')
+    op.drop_index('ix_payment_archive_user_id', table_name='payment_archive')
+    op.drop_table('payment_archive')
+    op.execute("DROP FUNCTION IF EXISTS create_payment_partitions;")
+    for name, columns in INDEXES:
+        op.create_index(name, 'payment', columns, unique=False)
+    create_triggers()
@@ -0,0 +1,44 @@
+"""park unmatched stripe events
+
+Revision ID: 583604af9eaf
+Revises: 9b1c64d2002f
+Create Date: 2026-10-18 20:11:40.227931
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '583604af9eaf'
+down_revision: Union[str, None] = '9b1c64d2002f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # events are recorded on arrival and marked applied once their payment was
+    # found; the rest stay parked until the payment shows up
+    op.add_column('stripe_event', sa.Column('payment_intent_id', sa.String(), nullable=True))
+    op.add_column('stripe_event', sa.Column('payment_id', sa.Integer(), nullable=True))
+    op.add_column('stripe_event', sa.Column('applied_at', sa.DateTime(), nullable=True))
+    op.add_column('stripe_event', sa.Column('attempts', sa.Integer(), server_default='0', nullable=False))
+    # every event recorded so far was applied
+    op.execute("UPDATE stripe_event SET applied_at = coalesce(received_at, now())")
+    op.create_index('ix_stripe_event_parked', 'stripe_event', ['received_at'], unique=False,
+                    postgresql_where=sa.text('applied_at IS NULL'))
+    # archived payments are looked up by intent when a late event arrives for them
+    op.create_index('ix_payment_archive_stripe_payment_intent_id', 'payment_archive', ['stripe_payment_intent_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_payment_archive_stripe_payment_intent_id', table_name='payment_archive')
+    op.drop_index('ix_stripe_event_parked', table_name='stripe_event', postgresql_where=sa.text('applied_at IS NULL'))
+    # parked events were never applied; dropping them lets stripe's redeliveries through again
+    op.execute("DELETE FROM stripe_event WHERE applied_at IS NULL")
+    op.drop_column('stripe_event', 'attempts')
+    op.drop_column('stripe_event', 'applied_at')
+    op.drop_column('stripe_event', 'payment_id')
+    op.drop_column('stripe_event', 'payment_intent_id')
@@ -0,0 +1,79 @@
+"""skip detached payments on enroll
+
+Revision ID: 7379505f7bab
+Revises: 583604af9eaf
+Create Date: 2026-10-18 20:27:05.861342
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7379505f7bab'
+down_revision: Union[str, None] = '583604af9eaf'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# record_completed_payments as created in 03a01518361f, with the enrollment
+# insert filtered by {enrollable}
+RECORD_COMPLETED_PAYMENTS = """
+CREATE OR REPLACE FUNCTION record_completed_payments(payment_ids integer[])
+RETURNS void AS $$
+BEGIN
+    IF cardinality(payment_ids) = 0 THEN
+        RETURN;
+    END IF;
+    WITH completed AS (
+        SELECT p.user_id, p.course_id, c.teacher_id, p.amount, coalesce(p.payment_date, now())::date AS day
+        FROM payment p JOIN courses c ON c.id = p.course_id
+        WHERE p.id = ANY(payment_ids)
+    ), enrolled AS (
+        INSERT INTO usercourse (user_id, course_id)
+        SELECT DISTINCT user_id, course_id FROM completed
+        {enrollable}
+        ON CONFLICT DO NOTHING
+        RETURNING user_id, course_id
+    ), enrollment_days AS (
+        SELECT c.course_id, c.teacher_id, min(c.day) AS day
+        FROM enrolled e JOIN completed c ON c.user_id = e.user_id AND c.course_id = e.course_id
+        GROUP BY e.user_id, c.course_id, c.teacher_id
+    ), deltas AS (
+        SELECT course_id, teacher_id, day, sum(amount) AS revenue, count(*) AS payments, 0 AS enrollments
+        FROM completed GROUP BY course_id, teacher_id, day
+        UNION ALL
+        SELECT course_id, teacher_id, day, 0, 0, count(*)
+        FROM enrollment_days GROUP BY course_id, teacher_id, day
+    ), course_rollup AS (
+        INSERT INTO course_daily_stats AS s (course_id, day, teacher_id, revenue, payments, enrollments)
+        SELECT course_id, day, max(teacher_id), sum(revenue), sum(payments), sum(enrollments)
+        FROM deltas GROUP BY course_id, day
+        ON CONFLICT (course_id, day) DO UPDATE SET
+            revenue = s.revenue + EXCLUDED.revenue,
+            payments = s.payments + EXCLUDED.payments,
+            enrollments = s.enrollments + EXCLUDED.enrollments
+    )
+    INSERT INTO teacher_daily_stats AS s (teacher_id, day, revenue, payments, enrollments)
+    SELECT teacher_id, day, sum(revenue), sum(payments), sum(enrollments)
+    FROM deltas WHERE teacher_id IS NOT NULL GROUP BY teacher_id, day
+    ON CONFLICT (teacher_id, day) DO UPDATE SET
+        revenue = s.revenue + EXCLUDED.revenue,
+        payments = s.payments + EXCLUDED.payments,
+        enrollments = s.enrollments + EXCLUDED.enrollments;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+
+def upgrade() -> None:
+    # a user or course delete sets the payment's column to null; such a payment
+    # still counts as revenue, but there is no one (or nothing) to enroll, and the
+    # usercourse primary key would reject the row and abort the whole statement.
+    # course_id is already non-null here, the join on courses drops the others
+    op.execute(RECORD_COMPLETED_PAYMENTS.format(enrollable="WHERE user_id IS NOT NULL"))
+
+
+def downgrade() -> None:
+    op.execute(RECORD_COMPLETED_PAYMENTS.format(enrollable=""))
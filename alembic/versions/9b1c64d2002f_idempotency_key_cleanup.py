@@ -0,0 +1,32 @@
+"""idempotency key cleanup
+
+Revision ID: 9b1c64d2002f
+Revises: 4f71866c1b04
+Create Date: 2026-10-18 20:02:13.518240
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b1c64d2002f'
+down_revision: Union[str, None] = '4f71866c1b04'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # a user's keys go with the user, so deleting someone who paid doesn't fail
+    op.drop_constraint('idempotency_key_user_id_fkey', 'idempotency_key', type_='foreignkey')
+    op.create_foreign_key('idempotency_key_user_id_fkey', 'idempotency_key', 'users', ['user_id'], ['id'], ondelete='CASCADE')
+    # expired keys are purged by age
+    op.create_index('ix_idempotency_key_created_at', 'idempotency_key', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_idempotency_key_created_at', table_name='idempotency_key')
+    op.drop_constraint('idempotency_key_user_id_fkey', 'idempotency_key', type_='foreignkey')
+    op.create_foreign_key('idempotency_key_user_id_fkey', 'idempotency_key', 'users', ['user_id'], ['id'])
@@ -0,0 +1,197 @@
+"""reverse rollups on uncompleted payments
+
+Revision ID: b5d2e8a41c97
+Revises: 7379505f7bab
+Create Date: 2026-10-18 21:02:44.518203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5d2e8a41c97'
+down_revision: Union[str, None] = '7379505f7bab'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # the rollups are history: deleting a course or a teacher must neither fail
+    # nor take their past revenue with it
+    op.drop_constraint('course_daily_stats_course_id_fkey', 'course_daily_stats', type_='foreignkey')
+    op.drop_constraint('teacher_daily_stats_teacher_id_fkey', 'teacher_daily_stats', type_='foreignkey')
+
+    # roll up payments that became completed (+1) and ones that stopped being
+    # completed (-1). An enrollment counts on the day of the first completed
+    # payment for its user and course, the same rule rebuildRollups uses, so the
+    # day is recomputed for every pair the change touches: from the completed
+    # payments before the statement and after it
+    op.execute("""
+    CREATE OR REPLACE FUNCTION record_payment_status_changes(completed_ids integer[], uncompleted_ids integer[])
+    RETURNS void AS $$
+    BEGIN
+        IF cardinality(completed_ids) + cardinality(uncompleted_ids) = 0 THEN
+            RETURN;
+        END IF;
+        -- enroll; a payment leaving completed does not take its enrollment away
+        INSERT INTO usercourse (user_id, course_id)
+        SELECT DISTINCT user_id, course_id FROM payment
+        WHERE id = ANY(completed_ids) AND user_id IS NOT NULL AND course_id IS NOT NULL
+        ON CONFLICT DO NOTHING;
+        WITH changed AS (
+            SELECT p.user_id, p.course_id, c.teacher_id, p.amount, coalesce(p.payment_date, now())::date AS day,
+                   CASE WHEN p.id = ANY(completed_ids) THEN 1 ELSE -1 END AS sign
+            FROM payment p JOIN courses c ON c.id = p.course_id
+            WHERE p.id = ANY(completed_ids) OR p.id = ANY(uncompleted_ids)
+        ), pairs AS (
+            SELECT DISTINCT user_id, course_id, teacher_id FROM changed WHERE user_id IS NOT NULL
+        ), enrollment_days AS (
+            SELECT pr.course_id, pr.teacher_id,
+                   min(coalesce(p.payment_date, now())::date) FILTER (
+                       WHERE (p.status = 'completed' AND NOT p.id = ANY(completed_ids)) OR p.id = ANY(uncompleted_ids)
+                   ) AS day_before,
+                   min(coalesce(p.payment_date, now())::date) FILTER (WHERE p.status = 'completed') AS day_after
+            FROM pairs pr JOIN payment p ON p.user_id = pr.user_id AND p.course_id = pr.course_id
+            GROUP BY pr.user_id, pr.course_id, pr.teacher_id
+        ), deltas AS (
+            SELECT course_id, teacher_id, day, sum(sign * amount) AS revenue, sum(sign) AS payments, 0 AS enrollments
+            FROM changed GROUP BY course_id, teacher_id, day
+            UNION ALL
+            SELECT course_id, teacher_id, day_before, 0, 0, -count(*)
+            FROM enrollment_days WHERE day_before IS NOT NULL AND day_before IS DISTINCT FROM day_after
+            GROUP BY course_id, teacher_id, day_before
+            UNION ALL
+            SELECT course_id, teacher_id, day_after, 0, 0, count(*)
+            FROM enrollment_days WHERE day_after IS NOT NULL AND day_after IS DISTINCT FROM day_before
+            GROUP BY course_id, teacher_id, day_after
+        ), course_rollup AS (
+            INSERT INTO course_daily_stats AS s (course_id, day, teacher_id, revenue, payments, enrollments)
+            SELECT course_id, day, max(teacher_id), sum(revenue), sum(payments), sum(enrollments)
+            FROM deltas GROUP BY course_id, day
+            ON CONFLICT (course_id, day) DO UPDATE SET
+                revenue = s.revenue + EXCLUDED.revenue,
+                payments = s.payments + EXCLUDED.payments,
+                enrollments = s.enrollments + EXCLUDED.enrollments
+        )
+        INSERT INTO teacher_daily_stats AS s (teacher_id, day, revenue, payments, enrollments)
+        SELECT teacher_id, day, sum(revenue), sum(payments), sum(enrollments)
+        FROM deltas WHERE teacher_id IS NOT NULL GROUP BY teacher_id, day
+        ON CONFLICT (teacher_id, day) DO UPDATE SET
+            revenue = s.revenue + EXCLUDED.revenue,
+            payments = s.payments + EXCLUDED.payments,
+            enrollments = s.enrollments + EXCLUDED.enrollments;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+    CREATE OR REPLACE FUNCTION enroll_completed_payments_on_insert()
+    RETURNS TRIGGER AS $$
+    BEGIN
+        PERFORM record_payment_status_changes(ARRAY(
+            SELECT id FROM new_payments WHERE status = 'completed'
+        ), '{}');
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+    # the manual status endpoint can move a completed payment to failed or pending
+    op.execute("""
+    CREATE OR REPLACE FUNCTION enroll_completed_payments_on_update()
+    RETURNS TRIGGER AS $$
+    BEGIN
+        PERFORM record_payment_status_changes(
+            ARRAY(
+                SELECT n.id FROM new_payments n JOIN old_payments o ON o.id = n.id
+                WHERE n.status = 'completed' AND o.status IS DISTINCT FROM 'completed'
+            ),
+            ARRAY(
+                SELECT n.id FROM new_payments n JOIN old_payments o ON o.id = n.id
+                WHERE o.status = 'completed' AND n.status IS DISTINCT FROM 'completed'
+            ));
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+    op.execute("DROP FUNCTION IF EXISTS record_completed_payments(integer[]);")
+
+
+def downgrade() -> None:
+    op.execute("""
+    CREATE OR REPLACE FUNCTION record_completed_payments(payment_ids integer[])
+    RETURNS void AS $$
+    BEGIN
+        IF cardinality(payment_ids) = 0 THEN
+            RETURN;
+        END IF;
+        WITH completed AS (
+            SELECT p.user_id, p.course_id, c.teacher_id, p.amount, coalesce(p.payment_date, now())::date AS day
+            FROM payment p JOIN courses c ON c.id = p.course_id
+            WHERE p.id = ANY(payment_ids)
+        ), enrolled AS (
+            INSERT INTO usercourse (user_id, course_id)
+            SELECT DISTINCT user_id, course_id FROM completed
+            WHERE user_id IS NOT NULL
+            ON CONFLICT DO NOTHING
+            RETURNING user_id, course_id
+        ), enrollment_days AS (
+            SELECT c.course_id, c.teacher_id, min(c.day) AS day
+            FROM enrolled e JOIN completed c ON c.user_id = e.user_id AND c.course_id = e.course_id
+            GROUP BY e.user_id, c.course_id, c.teacher_id
+        ), deltas AS (
+            SELECT course_id, teacher_id, day, sum(amount) AS revenue, count(*) AS payments, 0 AS enrollments
+            FROM completed GROUP BY course_id, teacher_id, day
+            UNION ALL
+            SELECT course_id, teacher_id, day, 0, 0, count(*)
+            FROM enrollment_days GROUP BY course_id, teacher_id, day
+        ), course_rollup AS (
+            INSERT INTO course_daily_stats AS s (course_id, day, teacher_id, revenue, payments, enrollments)
+            SELECT course_id, day, max(teacher_id), sum(revenue), sum(payments), sum(enrollments)
+            FROM deltas GROUP BY course_id, day
+            ON CONFLICT (course_id, day) DO UPDATE SET
+                revenue = s.revenue + EXCLUDED.revenue,
+                payments = s.payments + EXCLUDED.payments,
+                enrollments = s.enrollments + EXCLUDED.enrollments
+        )
+        INSERT INTO teacher_daily_stats AS s (teacher_id, day, revenue, payments, enrollments)
+        SELECT teacher_id, day, sum(revenue), sum(payments), sum(enrollments)
+        FROM deltas WHERE teacher_id IS NOT NULL GROUP BY teacher_id, day
+        ON CONFLICT (teacher_id, day) DO UPDATE SET
+            revenue = s.revenue + EXCLUDED.revenue,
+            payments = s.payments + EXCLUDED.payments,
+            enrollments = s.enrollments + EXCLUDED.enrollments;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+    CREATE OR REPLACE FUNCTION enroll_completed_payments_on_insert()
+    RETURNS TRIGGER AS $$
+    BEGIN
+        PERFORM record_completed_payments(ARRAY(
+            SELECT id FROM new_payments WHERE status = 'completed'
+        ));
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+    CREATE OR REPLACE FUNCTION enroll_completed_payments_on_update()
+    RETURNS TRIGGER AS $$
+    BEGIN
+        PERFORM record_completed_payments(ARRAY(
+            SELECT n.id FROM new_payments n JOIN old_payments o ON o.id = n.id
+            WHERE n.status = 'completed' AND o.status IS DISTINCT FROM 'completed'
+        ));
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+    op.execute("DROP FUNCTION IF EXISTS record_payment_status_changes(integer[], integer[]);")
+
+    # rows of deleted courses and teachers would violate the restored keys
+    op.execute("DELETE FROM course_daily_stats WHERE course_id NOT IN (SELECT id FROM courses)")
+    op.execute("DELETE FROM teacher_daily_stats WHERE teacher_id NOT IN (SELECT id FROM users)")
+    op.create_foreign_key('teacher_daily_stats_teacher_id_fkey', 'teacher_daily_stats', 'users', ['teacher_id'], ['id'])
+    op.create_foreign_key('course_daily_stats_course_id_fkey', 'course_daily_stats', 'courses', ['course_id'], ['id'])
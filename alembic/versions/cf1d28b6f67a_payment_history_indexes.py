@@ -0,0 +1,46 @@
+"""payment history indexes
+
+Revision ID: cf1d28b6f67a
+Revises: e6f1f5a22ce4
+Create Date: 2026-10-18 16:30:44.092561
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'cf1d28b6f67a'
+down_revision: Union[str, None] = 'e6f1f5a22ce4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (filter, payment_date, id) indexes for newest-first keyset pages; they also
+# serve the plain user_id / course_id lookups, so the single column ones go
+INDEXES = [
+    ('ix_payment_user_id_payment_date_id', 'payment', ['user_id', 'payment_date', 'id']),
+    ('ix_payment_course_id_payment_date_id', 'payment', ['course_id', 'payment_date', 'id']),
+    ('ix_payment_payment_date_id', 'payment', ['payment_date', 'id']),
+]
+REPLACED = [
+    ('ix_payment_user_id', 'payment', ['user_id']),
+    ('ix_payment_course_id', 'payment', ['course_id']),
+]
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True, if_not_exists=True)
+        for name, table, columns in REPLACED:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns in REPLACED:
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True, if_not_exists=True)
+        for name, table, columns in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,87 @@
+"""enroll on payment completion
+
+Revision ID: e6f1f5a22ce4
+Revises: 6a0bcabb90de
+Create Date: 2026-10-18 15:52:08.164937
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6f1f5a22ce4'
+down_revision: Union[str, None] = '6a0bcabb90de'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS trigger_add_user_course ON payment;")
+    op.execute("DROP FUNCTION IF EXISTS add_user_course;")
+
+    # statement level triggers: a bulk status UPDATE enrolls all its rows with one INSERT
+    op.execute("""
+    CREATE OR REPLACE FUNCTION enroll_completed_payments_on_insert()
+    RETURNS TRIGGER AS $$
+    BEGIN
+        INSERT INTO usercourse (user_id, course_id)
+        SELECT DISTINCT user_id, course_id FROM new_payments
+        WHERE status = 'completed'
+        ON CONFLICT DO NOTHING;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+    CREATE OR REPLACE FUNCTION enroll_completed_payments_on_update()
+    RETURNS TRIGGER AS $$
+    BEGIN
+        INSERT INTO usercourse (user_id, course_id)
+        SELECT DISTINCT n.user_id, n.course_id
+        FROM new_payments n JOIN old_payments o ON o.id = n.id
+        WHERE n.status = 'completed' AND o.status IS DISTINCT FROM 'completed'
+        ON CONFLICT DO NOTHING;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+    CREATE TRIGGER trigger_enroll_on_payment_insert
+    AFTER INSERT ON payment
+    REFERENCING NEW TABLE AS new_payments
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION enroll_completed_payments_on_insert();
+    """)
+    op.execute("""
+    CREATE TRIGGER trigger_enroll_on_payment_update
+    AFTER UPDATE ON payment
+    REFERENCING OLD TABLE AS old_payments NEW TABLE AS new_payments
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION enroll_completed_payments_on_update();
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS trigger_enroll_on_payment_update ON payment;")
+    op.execute("DROP TRIGGER IF EXISTS trigger_enroll_on_payment_insert ON payment;")
+    op.execute("DROP FUNCTION IF EXISTS enroll_completed_payments_on_update;")
+    op.execute("DROP FUNCTION IF EXISTS enroll_completed_payments_on_insert;")
+    op.execute("""
+    CREATE OR REPLACE FUNCTION add_user_course()
+    RETURNS TRIGGER AS $$
+    BEGIN
+        INSERT INTO usercourse (user_id, course_id) 
+        VALUES (NEW.user_id, NEW.course_id);
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+    CREATE TRIGGER trigger_add_user_course
+    AFTER INSERT ON payment
+    FOR EACH ROW
+    EXECUTE FUNCTION add_user_course();
+    """)
@@ -0,0 +1,54 @@
+# in-process stand-in for the Stripe API, plugged in as the stripe http client.
+#
+# Answers PaymentIntent calls with canned objects after a configurable delay,
+# so load tests exercise the real stripe library code path without a network.
+# Install it with service.stripeClient.get_stripe_client(http_client=...).
+import asyncio
+import itertools
+import json
+import time
+from typing import Mapping, Tuple
+from urllib.parse import parse_qsl
+from stripe import HTTPClient
+
+
+class FakeStripeClient(HTTPClient):
+    name = "fake"
+
+    def __init__(self, latency: float = 0.05) -> None:
+        super().__init__()
+        self.latency = latency
+        self.calls = 0
+        self._ids = itertools.count(1)
+
+    def _respond(self, method: str, url: str, post_data) -> Tuple[bytes, int, Mapping[str, str]]:
+        self.calls += 1
+        params = dict(parse_qsl(post_data or ""))
+        if method == "post" and url.rstrip("/").endswith("/v1/payment_intents"):
+            intent_id = f"pi_fake_{next(self._ids)}"
+            body = {
+                "id": intent_id,
+                "object": "payment_intent",
+                "amount": int(params.get("amount", 0)),
+                "currency": params.get("currency", "usd"),
+                "status": "requires_payment_method",
+                "client_secret": f"{intent_id}_secret_fake",
+                "metadata": {key[len("metadata["):-1]: value for key, value in params.items() if key.startswith("metadata[")},
+            }
+            return json.dumps(body).encode(), 200, {"request-id": f"req_{intent_id}"}
+        error = {"error": {"type": "invalid_request_error", "message": f"fake stripe: unhandled {method.upper()} {url}"}}
+        return json.dumps(error).encode(), 404, {}
+
+    def request(self, method, url, headers, post_data=None, *, _usage=None):
+        time.sleep(self.latency)
+        return self._respond(method, url, post_data)
+
+    async def request_async(self, method, url, headers, post_data=None):
+        await asyncio.sleep(self.latency)
+        return self._respond(method, url, post_data)
+
+    def close(self):
+        pass
+
+    async def close_async(self):
+        pass
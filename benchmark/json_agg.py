@@ -0,0 +1,95 @@
+# user list responses built three ways, at growing sizes:
+#   orm       - ORM objects, model_validate and FastAPI's response_model pass
+#   rows      - selected columns encoded by rows_to_json (the default)
+#   json_agg  - the JSON array built by postgres (JSON_AGG_RESPONSES=true)
+#
+# Seeds the users inside a transaction that is rolled back at the end, so it
+# can be pointed at a scratch copy of the real database.
+#
+#   python -m benchmark.json_agg --sizes 1000 10000 100000 --repeat 5
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import tracemalloc
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from sqlalchemy import func, select, text
+from config.config import async_engine, async_sessionlocal
+from model.user import User
+from schema.userSch import UserResp
+from service.serialization import json_agg_query, rows_to_json
+from service.userServ import USER_COLUMNS
+
+RESPONSE_FIELD = create_response_field(name="response", type_=list[UserResp])
+
+
+async def orm_path(db, seeded, size: int) -> bytes:
+    result = await db.execute(select(User).where(seeded).order_by(User.id).limit(size))
+    items = [UserResp.model_validate(user) for user in result.scalars().all()]
+    content = await serialize_response(field=RESPONSE_FIELD, response_content=items)
+    # drop the loaded users so every round hydrates them again
+    db.expunge_all()
+    return JSONResponse(content).body
+
+
+async def rows_path(db, seeded, size: int) -> bytes:
+    result = await db.execute(select(*USER_COLUMNS).where(seeded).order_by(User.id).limit(size))
+    return rows_to_json(result.keys(), result.all())
+
+
+async def json_agg_path(db, seeded, size: int) -> bytes:
+    query = select(*USER_COLUMNS).where(seeded).order_by(User.id).limit(size)
+    result = await db.execute(json_agg_query(query, "id"))
+    return result.scalar_one().encode()
+
+
+PATHS = {"orm": orm_path, "rows": rows_path, "json_agg": json_agg_path}
+
+
+async def measure(path, db, seeded, size: int, repeat: int) -> dict:
+    body = await path(db, seeded, size)
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await path(db, seeded, size)
+        samples.append(time.perf_counter() - started)
+    tracemalloc.start()
+    await path(db, seeded, size)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"ms": round(statistics.median(samples) * 1000, 2), "peak_kib": round(peak / 1024, 1),
+            "bytes": len(body), "body": body}
+
+
+async def main(args: argparse.Namespace) -> dict:
+    report = {}
+    async with async_sessionlocal() as db:
+        try:
+            before = (await db.execute(select(func.coalesce(func.max(User.id), 0)))).scalar_one()
+            await db.execute(text("""
+                INSERT INTO users (name, email, password, role_id)
+                SELECT 'jsonagg_user_' || g, 'jsonagg_user_' || g || '@jsonagg.test', 'x', ARRAY[2]
+                FROM generate_series(1, :users) g
+            """), {"users": max(args.sizes)})
+            await db.execute(text("ANALYZE users"))
+            seeded = User.id > before
+            for size in args.sizes:
+                results = {name: await measure(path, db, seeded, size, args.repeat) for name, path in PATHS.items()}
+                bodies = [json.loads(result.pop("body")) for result in results.values()]
+                if any(body != bodies[0] for body in bodies):
+                    raise SystemExit(f"the paths returned different JSON for {size} rows")
+                report[size] = results
+        finally:
+            await db.rollback()
+    await async_engine.dispose()
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    print(json.dumps(asyncio.run(main(parser.parse_args())), indent=2))
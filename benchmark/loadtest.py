@@ -0,0 +1,197 @@
+# load test that replays the FrontEnd flows against the app in-process.
+#
+# Every virtual user loops over the session a student goes through in the
+# browser: login, the home page's dashboard call, a course page, a
+# purchase and the payment-success polling. The app runs in-process on top of
+# the Postgres in DATABASE_URL (use a scratch database, the run creates users,
+# courses and payments) and Stripe is replaced by benchmark.fake_stripe.
+#
+# The report is JSON with throughput and p50/p95/p99 per endpoint; pass a
+# previous report as --baseline to get the deltas next to it.
+#
+#   python -m benchmark.loadtest --users 20 --duration 30 --out report.json
+#   python -m benchmark.loadtest --baseline report.json
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from collections import defaultdict
+import httpx
+from jose import jwt
+from benchmark.fake_stripe import FakeStripeClient
+from main import app
+from service import stripeClient
+
+PASSWORD = "loadtest-password"
+
+
+def percentile(samples: list, pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Recorder():
+    def __init__(self) -> None:
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    async def call(self, client: httpx.AsyncClient, name: str, method: str, url: str, **kwargs) -> httpx.Response:
+        started = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        self.latencies[name].append((time.perf_counter() - started) * 1000)
+        if response.status_code >= 400:
+            self.errors[name] += 1
+        return response
+
+    def report(self, elapsed: float) -> dict:
+        endpoints = {}
+        for name, samples in sorted(self.latencies.items()):
+            endpoints[name] = {
+                "requests": len(samples),
+                "errors": self.errors[name],
+                "rps": round(len(samples) / elapsed, 2),
+                "p50_ms": round(percentile(samples, 50), 2),
+                "p95_ms": round(percentile(samples, 95), 2),
+                "p99_ms": round(percentile(samples, 99), 2),
+            }
+        total = sum(len(samples) for samples in self.latencies.values())
+        return {"seconds": round(elapsed, 2), "requests": total, "rps": round(total / elapsed, 2), "endpoints": endpoints}
+
+
+def bearer(token: str) -> dict:
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def login(client: httpx.AsyncClient, username: str, recorder: Recorder = None) -> str:
+    data = {"username": username, "password": PASSWORD}
+    if recorder is None:
+        response = await client.post("/user/token", data=data)
+    else:
+        response = await recorder.call(client, "POST /user/token", "POST", "/user/token", data=data)
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+# users and courses the run works on; names are unique per run
+async def setup(client: httpx.AsyncClient, args: argparse.Namespace) -> tuple:
+    run_id = uuid.uuid4().hex[:8]
+    admin = f"loadtest_{run_id}_admin"
+    response = await client.post("/user/create", json={"name": admin, "email": f"{admin}@loadtest.local", "password": PASSWORD, "role_id": [1, 3]})
+    response.raise_for_status()
+    token = await login(client, admin)
+    teacher_id = jwt.get_unverified_claims(token)["id"]
+    course_ids = []
+    for index in range(args.courses):
+        response = await client.post("/course/create", headers=bearer(token), json={
+            "title": f"Load test course {run_id} {index}",
+            "description": "Seeded by benchmark.loadtest",
+            "price": 10 + index % 90,
+            "category": f"loadtest_{index % 5}",
+            "start_date": "2025-01-01",
+            "end_date": "2025-12-31",
+            "teacher_id": teacher_id,
+            "video_url": "",
+        })
+        response.raise_for_status()
+        course_ids.append(response.json()["id"])
+    usernames = []
+    for index in range(args.users):
+        name = f"loadtest_{run_id}_{index}"
+        # teachers get the catalog page in their dashboard, like admins
+        response = await client.post("/user/create", json={"name": name, "email": f"{name}@loadtest.local", "password": PASSWORD, "role_id": [2, 3]})
+        response.raise_for_status()
+        usernames.append(name)
+    return usernames, course_ids
+
+
+async def session(client: httpx.AsyncClient, recorder: Recorder, username: str, course_ids: list, purchased: set, args: argparse.Namespace) -> None:
+    token = await login(client, username, recorder)
+    headers = bearer(token)
+    user_id = jwt.get_unverified_claims(token)["id"]
+    # home.tsx loads everything it shows with one call
+    await recorder.call(client, "GET /dashboard/", "GET", "/dashboard/?limit=3", headers=headers)
+    available = [course_id for course_id in course_ids if course_id not in purchased]
+    if not available:
+        return
+    course_id = random.choice(available)
+    response = await recorder.call(client, "GET /course/{course_id}", "GET", f"/course/{course_id}", headers=headers)
+    price = response.json()["price"] if response.status_code == 200 else 10
+    response = await recorder.call(client, "POST /payment/create", "POST", "/payment/create", headers=headers, json={
+        "user_id": user_id,
+        "course_id": course_id,
+        "amount": price,
+        "payment_method": "stripe",
+        "status": "pending",
+        "payment_date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    })
+    if response.status_code != 200:
+        return
+    purchased.add(course_id)
+    payment_id = response.json()["id"]
+    # payment-success.tsx loads the payment and then its course
+    for _ in range(args.polls):
+        await recorder.call(client, "GET /payment/{payment_id}", "GET", f"/payment/{payment_id}", headers=headers)
+        await asyncio.sleep(args.poll_interval)
+    await recorder.call(client, "GET /course/{course_id}", "GET", f"/course/{course_id}", headers=headers)
+
+
+async def virtual_user(client: httpx.AsyncClient, recorder: Recorder, username: str, course_ids: list, deadline: float, args: argparse.Namespace) -> None:
+    purchased = set()
+    while time.perf_counter() < deadline:
+        await session(client, recorder, username, course_ids, purchased, args)
+
+
+def compare(report: dict, baseline: dict) -> dict:
+    deltas = {}
+    for name, current in report["endpoints"].items():
+        previous = baseline.get("endpoints", {}).get(name)
+        if previous is None:
+            continue
+        deltas[name] = {key: round(current[key] - previous[key], 2) for key in ("rps", "p50_ms", "p95_ms", "p99_ms")}
+    return deltas
+
+
+async def main(args: argparse.Namespace) -> dict:
+    fake = FakeStripeClient(latency=args.stripe_latency)
+    stripeClient.STRIPE_API_KEY = stripeClient.STRIPE_API_KEY or "sk_test_loadtest"
+    stripeClient.get_stripe_client(http_client=fake)
+    recorder = Recorder()
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=None) as client:
+            usernames, course_ids = await setup(client, args)
+            started = time.perf_counter()
+            deadline = started + args.duration
+            await asyncio.gather(*(virtual_user(client, recorder, name, course_ids, deadline, args) for name in usernames))
+            elapsed = time.perf_counter() - started
+    report = recorder.report(elapsed)
+    report["config"] = {key: value for key, value in vars(args).items() if key not in ("out", "baseline")}
+    report["stripe_calls"] = fake.calls
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=20, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds to run")
+    parser.add_argument("--courses", type=int, default=50)
+    parser.add_argument("--polls", type=int, default=3, help="GET /payment/{id} calls after each purchase")
+    parser.add_argument("--poll-interval", type=float, default=0.5)
+    parser.add_argument("--stripe-latency", type=float, default=0.05, help="fake PaymentIntent latency in seconds")
+    parser.add_argument("--out", help="write the JSON report here")
+    parser.add_argument("--baseline", help="previous JSON report to compare against")
+    args = parser.parse_args()
+    report = asyncio.run(main(args))
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            report["delta_vs_baseline"] = compare(report, json.load(baseline))
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as out:
+            out.write(output)
+    print(output)
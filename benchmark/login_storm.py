@@ -0,0 +1,81 @@
+# login storm benchmark: bcrypt on the event loop vs the bounded hashing pool.
+#
+# A storm of concurrent logins runs next to a probe that stands in for an
+# unrelated endpoint, waking every few milliseconds. The probe's lateness is
+# the latency those endpoints would see while logins are being verified.
+#
+#   python -m benchmark.login_storm --logins 200 --concurrency 50
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from service.hashing import bcryptContext, hash_pool, verify_password
+
+
+def percentile(samples: list, pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def inline_verify(password: str, hashed: str) -> bool:
+    return bcryptContext.verify(password, hashed)
+
+
+async def probe(stop: asyncio.Event, interval: float, samples: list) -> None:
+    while not stop.is_set():
+        expected = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        samples.append((time.perf_counter() - expected) * 1000)
+
+
+async def storm(verify, hashed: str, logins: int, concurrency: int, interval: float) -> dict:
+    limit = asyncio.Semaphore(concurrency)
+    stop = asyncio.Event()
+    probe_samples: list = []
+    login_samples: list = []
+
+    async def login() -> None:
+        async with limit:
+            started = time.perf_counter()
+            await verify("correct horse battery staple", hashed)
+            login_samples.append((time.perf_counter() - started) * 1000)
+
+    probe_task = asyncio.create_task(probe(stop, interval, probe_samples))
+    started = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe_task
+    return {
+        "logins": logins,
+        "seconds": round(elapsed, 3),
+        "logins_per_second": round(logins / elapsed, 2),
+        "login_ms": {"p50": percentile(login_samples, 50), "p95": percentile(login_samples, 95), "p99": percentile(login_samples, 99)},
+        "unrelated_delay_ms": {
+            "mean": statistics.fmean(probe_samples) if probe_samples else 0.0,
+            "p50": percentile(probe_samples, 50),
+            "p95": percentile(probe_samples, 95),
+            "p99": percentile(probe_samples, 99),
+        },
+    }
+
+
+async def main(args: argparse.Namespace) -> dict:
+    hashed = bcryptContext.hash("correct horse battery staple")
+    # keep the pool from shedding load so both runs verify every login
+    hash_pool.queue_limit = max(hash_pool.queue_limit, args.concurrency)
+    before = await storm(inline_verify, hashed, args.logins, args.concurrency, args.interval)
+    after = await storm(verify_password, hashed, args.logins, args.concurrency, args.interval)
+    return {"before": before, "after": after, "pool": hash_pool.stats()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--interval", type=float, default=0.005, help="probe interval in seconds")
+    print(json.dumps(asyncio.run(main(parser.parse_args())), indent=2))
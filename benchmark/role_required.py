@@ -0,0 +1,45 @@
+# micro-benchmark of the TokenHandler.role_required wrapper on its own.
+#
+# Calls a no-op handler directly and through the wrapper and reports the
+# per-call overhead the authorization check adds.
+#
+#   python -m benchmark.role_required --calls 200000
+import argparse
+import asyncio
+import json
+import time
+from model.role import Role
+from schema.userSch import UserResp
+from service.tokenHandler import TokenHandler
+
+
+async def handler(user: UserResp):
+    return user
+
+
+guarded = TokenHandler.role_required([Role.ADMIN, Role.TEACHER, Role.USER])(handler)
+
+
+async def timed(func, user: UserResp, calls: int) -> float:
+    started = time.perf_counter()
+    for _ in range(calls):
+        await func(user)
+    return time.perf_counter() - started
+
+
+async def main(args: argparse.Namespace) -> dict:
+    user = UserResp(id=1, name="bench", email="bench@example.com", role_id=[Role.USER])
+    bare = await timed(handler, user, args.calls)
+    wrapped = await timed(guarded, user, args.calls)
+    return {
+        "calls": args.calls,
+        "bare_ns_per_call": round(bare / args.calls * 1e9, 1),
+        "wrapped_ns_per_call": round(wrapped / args.calls * 1e9, 1),
+        "overhead_ns_per_call": round((wrapped - bare) / args.calls * 1e9, 1),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200000)
+    print(json.dumps(asyncio.run(main(parser.parse_args())), indent=2))
@@ -0,0 +1,82 @@
+# CPU and memory per row of a list response: ORM objects + model_validate +
+# FastAPI's response_model pass, against selected columns encoded by
+# service.serialization.rows_to_json.
+#
+# Runs in memory on generated course rows, so no database is needed; the
+# ORM side builds mapped Course objects the way a query result would.
+#
+#   python -m benchmark.serialization --rows 10000 --repeat 5
+import argparse
+import asyncio
+import json
+import time
+import tracemalloc
+from datetime import date
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from model.course import Course
+from schema.CourseSch import CourseResp
+from service.courseServ import COURSE_COLUMNS
+from service.serialization import rows_to_json
+
+KEYS = [column.key for column in COURSE_COLUMNS]
+RESPONSE_FIELD = create_response_field(name="response", type_=list[CourseResp])
+
+
+def generate(rows: int) -> list:
+    return [(index, f"Course {index}", "Generated course description " * 4, 10 + index % 90 + 0.99,
+             f"category_{index % 50}", date(2025, 1, 1), date(2025, 12, 31), index % 500, "https://video.local/x")
+            for index in range(rows)]
+
+
+async def orm_path(rows: list) -> bytes:
+    courses = [Course(**dict(zip(KEYS, row))) for row in rows]
+    items = [CourseResp.model_validate(course) for course in courses]
+    content = await serialize_response(field=RESPONSE_FIELD, response_content=items)
+    return JSONResponse(content).body
+
+
+async def fast_path(rows: list) -> bytes:
+    return rows_to_json(KEYS, rows)
+
+
+async def measure(path, rows: list, repeat: int) -> dict:
+    body = await path(rows)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        await path(rows)
+    elapsed = (time.perf_counter() - started) / repeat
+    tracemalloc.start()
+    await path(rows)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "ms": round(elapsed * 1000, 2),
+        "us_per_row": round(elapsed / len(rows) * 1e6, 3),
+        "peak_kib": round(peak / 1024, 1),
+        "bytes_per_row": round(peak / len(rows), 1),
+        "body": body,
+    }
+
+
+async def main(args: argparse.Namespace) -> dict:
+    rows = generate(args.rows)
+    orm = await measure(orm_path, rows, args.repeat)
+    fast = await measure(fast_path, rows, args.repeat)
+    if json.loads(orm.pop("body")) != json.loads(fast.pop("body")):
+        raise SystemExit("the two paths produced different JSON")
+    return {
+        "rows": args.rows,
+        "orm": orm,
+        "fast": fast,
+        "cpu_speedup": round(orm["ms"] / fast["ms"], 1),
+        "memory_reduction": round(orm["peak_kib"] / fast["peak_kib"], 1),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    print(json.dumps(asyncio.run(main(parser.parse_args())), indent=2))
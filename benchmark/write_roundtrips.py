@@ -0,0 +1,110 @@
+# statements per mutation: the old load / commit / refresh writes against
+# the RETURNING based ones in CourseServ and UserServ.
+#
+# Counts what each write sends to the database, by listening on the engine,
+# and times it. Creates its own users and courses and deletes them again, so
+# it can run against a scratch copy of the real database.
+#
+#   python -m benchmark.write_roundtrips --rounds 50
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from datetime import date
+from sqlalchemy import event, select
+from config.config import async_engine, async_sessionlocal
+from model.course import Course
+from model.user import User
+from schema.CourseSch import CourseSch, CourseResp
+from schema.userSch import UserResp, UserSch
+from service.courseServ import CourseServ
+from service.userServ import UserServ
+
+statements = 0
+
+
+@event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+def count_statement(*args) -> None:
+    global statements
+    statements += 1
+
+
+# the previous implementations, kept here as the baseline
+async def orm_create_course(db, course: CourseSch) -> CourseResp:
+    _course = Course(**course.model_dump())
+    db.add(_course)
+    await db.commit()
+    await db.refresh(_course)
+    return CourseResp.model_validate(_course)
+
+
+async def orm_update_course(db, course_id: int, course: CourseSch) -> CourseResp:
+    _course = (await db.execute(select(Course).where(Course.id == course_id))).scalars().first()
+    for key, value in course.model_dump().items():
+        setattr(_course, key, value)
+    await db.commit()
+    await db.refresh(_course)
+    return CourseResp.model_validate(_course)
+
+
+async def orm_delete_course(db, course_id: int) -> None:
+    _course = (await db.execute(select(Course).where(Course.id == course_id))).scalars().first()
+    await db.delete(_course)
+    await db.commit()
+
+
+async def orm_update_user(db, user_id: int, user: UserResp) -> UserResp:
+    _user = (await db.execute(select(User).where(User.id == user_id))).scalars().first()
+    _user.name, _user.email, _user.role_id = user.name, user.email, user.role_id
+    await db.commit()
+    await db.refresh(_user)
+    return UserResp.model_validate(_user)
+
+
+async def measure(results: dict, name: str, write) -> object:
+    global statements
+    async with async_sessionlocal() as db:
+        before = statements
+        started = time.perf_counter()
+        value = await write(db)
+        elapsed = time.perf_counter() - started
+    sample = results.setdefault(name, {"calls": 0, "statements": 0, "seconds": 0.0})
+    sample["calls"] += 1
+    sample["statements"] += statements - before
+    sample["seconds"] += elapsed
+    return value
+
+
+async def main(args: argparse.Namespace) -> dict:
+    results = {}
+    run_id = uuid.uuid4().hex[:8]
+    async with async_sessionlocal() as db:
+        teacher = await UserServ(db).create_user(UserSch(name=f"writes_{run_id}", email=f"writes_{run_id}@bench.local",
+                                                         password="bench", role_id=[3]))
+    course = CourseSch(title=f"Write benchmark {run_id}", description="Seeded by benchmark.write_roundtrips", price=10,
+                       category="bench", start_date=date(2025, 1, 1), end_date=date(2025, 12, 31),
+                       teacher_id=teacher.id, video_url="")
+    renamed = course.model_copy(update={"price": 20})
+    for _ in range(args.rounds):
+        created = await measure(results, "orm create_course", lambda db: orm_create_course(db, course))
+        await measure(results, "orm update_course", lambda db: orm_update_course(db, created.id, renamed))
+        await measure(results, "orm update_user", lambda db: orm_update_user(db, teacher.id, teacher))
+        await measure(results, "orm delete_course", lambda db: orm_delete_course(db, created.id))
+
+        created = await measure(results, "returning create_course", lambda db: CourseServ(db).create_course(course))
+        await measure(results, "returning update_course", lambda db: CourseServ(db).update_course(created.id, renamed))
+        await measure(results, "returning update_user", lambda db: UserServ(db).update_user(teacher.id, teacher))
+        await measure(results, "returning delete_course", lambda db: CourseServ(db).delete_course(created.id))
+    async with async_sessionlocal() as db:
+        await UserServ(db).delete_user(teacher.id)
+    await async_engine.dispose()
+    return {name: {"statements_per_call": sample["statements"] / sample["calls"],
+                   "ms_per_call": round(sample["seconds"] / sample["calls"] * 1000, 3)}
+            for name, sample in sorted(results.items())}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=50)
+    print(json.dumps(asyncio.run(main(parser.parse_args())), indent=2))
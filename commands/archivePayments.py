@@ -0,0 +1,39 @@
+# create upcoming payment partitions and archive stale pending/failed payments.
+#
+# The app does the same every PAYMENT_MAINTENANCE_INTERVAL seconds; this is
+# for running it from cron or draining a large backlog by hand. Each chunk is
+# its own transaction, so locks are held briefly and an interrupted run keeps
+# what it already moved.
+#
+#   python -m commands.archivePayments --older-than-days 30 --chunk-size 1000
+import argparse
+import time
+from datetime import timedelta
+from config.config import engine
+from service.paymentMaintenance import (CREATE_PARTITIONS, ARCHIVE_CHUNK, PAYMENT_PARTITIONS_AHEAD,
+                                        PAYMENT_ARCHIVE_AFTER_DAYS, PAYMENT_ARCHIVE_CHUNK)
+
+
+def archive_payments(older_than_days: int, chunk_size: int, months_ahead: int, pause: float) -> dict:
+    with engine.begin() as connection:
+        created = connection.execute(CREATE_PARTITIONS, {"months_ahead": months_ahead}).scalar_one()
+    archived = 0
+    while True:
+        with engine.begin() as connection:
+            moved = connection.execute(ARCHIVE_CHUNK, {"older_than": timedelta(days=older_than_days),
+                                                       "chunk_size": chunk_size}).scalar_one()
+        archived += moved
+        if moved < chunk_size:
+            break
+        time.sleep(pause)
+    return {"partitions_created": created, "archived": archived}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--older-than-days", type=int, default=PAYMENT_ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--chunk-size", type=int, default=PAYMENT_ARCHIVE_CHUNK)
+    parser.add_argument("--months-ahead", type=int, default=PAYMENT_PARTITIONS_AHEAD)
+    parser.add_argument("--pause", type=float, default=0.1, help="seconds to wait between chunks")
+    args = parser.parse_args()
+    print(archive_payments(args.older_than_days, args.chunk_size, args.months_ahead, args.pause))
@@ -0,0 +1,51 @@
+# rebuild course_daily_stats and teacher_daily_stats from the raw tables.
+#
+# The triggers keep the rollups current as payments complete; this recomputes
+# them from scratch, e.g. after repairEnrollments or a manual data fix. An
+# enrollment is counted on the day of the first completed payment for its user
+# and course, as the triggers do. Payments of deleted courses no longer point at
+# one, so the rows of deleted courses and teachers are kept, not recomputed.
+#
+#   python -m commands.rebuildRollups
+from sqlalchemy import text
+from config.config import engine
+
+
+def rebuild_rollups() -> dict:
+    with engine.begin() as connection:
+        # block writers so no payment completes between the delete and the rebuild
+        connection.execute(text("LOCK TABLE course_daily_stats, teacher_daily_stats IN EXCLUSIVE MODE"))
+        connection.execute(text("DELETE FROM course_daily_stats WHERE course_id IN (SELECT id FROM courses)"))
+        connection.execute(text("DELETE FROM teacher_daily_stats WHERE teacher_id IN (SELECT id FROM users)"))
+        connection.execute(text("""
+            CREATE TEMP TABLE rollup_deltas ON COMMIT DROP AS
+            WITH completed AS (
+                SELECT p.user_id, p.course_id, c.teacher_id, p.amount, coalesce(p.payment_date, now())::date AS day
+                FROM payment p JOIN courses c ON c.id = p.course_id
+                WHERE p.status = 'completed'
+            ), enrollment_days AS (
+                SELECT course_id, teacher_id, min(day) AS day
+                FROM completed WHERE user_id IS NOT NULL
+                GROUP BY user_id, course_id, teacher_id
+            )
+            SELECT course_id, teacher_id, day, sum(amount) AS revenue, count(*) AS payments, 0 AS enrollments
+            FROM completed GROUP BY course_id, teacher_id, day
+            UNION ALL
+            SELECT course_id, teacher_id, day, 0, 0, count(*)
+            FROM enrollment_days GROUP BY course_id, teacher_id, day
+        """))
+        courses = connection.execute(text("""
+            INSERT INTO course_daily_stats (course_id, day, teacher_id, revenue, payments, enrollments)
+            SELECT course_id, day, max(teacher_id), sum(revenue), sum(payments), sum(enrollments)
+            FROM rollup_deltas GROUP BY course_id, day
+        """)).rowcount
+        teachers = connection.execute(text("""
+            INSERT INTO teacher_daily_stats (teacher_id, day, revenue, payments, enrollments)
+            SELECT teacher_id, day, sum(revenue), sum(payments), sum(enrollments)
+            FROM rollup_deltas WHERE teacher_id IS NOT NULL GROUP BY teacher_id, day
+        """)).rowcount
+    return {"course_days": courses, "teacher_days": teachers}
+
+
+if __name__ == "__main__":
+    print(rebuild_rollups())
@@ -0,0 +1,37 @@
+# recompute usercourse from completed payments in bulk.
+#
+# Enrolls every (user, course) pair that has a completed payment (payments
+# detached by a user or course delete have no pair to enroll) and, with
+# --prune, removes enrollments that have none (left behind by the old
+# insert-time trigger for pending and failed payments).
+#
+#   python -m commands.repairEnrollments --prune
+import argparse
+from sqlalchemy import text
+from config.config import engine
+
+
+def repair_enrollments(prune: bool) -> dict:
+    with engine.begin() as connection:
+        added = connection.execute(text("""
+            INSERT INTO usercourse (user_id, course_id)
+            SELECT DISTINCT user_id, course_id FROM payment
+            WHERE status = 'completed' AND user_id IS NOT NULL AND course_id IS NOT NULL
+            ON CONFLICT DO NOTHING
+        """)).rowcount
+        removed = 0
+        if prune:
+            removed = connection.execute(text("""
+                DELETE FROM usercourse uc
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM payment p
+                    WHERE p.user_id = uc.user_id AND p.course_id = uc.course_id AND p.status = 'completed'
+                )
+            """)).rowcount
+    return {"added": added, "removed": removed}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--prune", action="store_true", help="also delete enrollments without a completed payment")
+    print(repair_enrollments(parser.parse_args().prune))
@@ -1,7 +1,11 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from dotenv import load_dotenv
+from config.pool import pool_options, DB_BACKGROUND_CONNECTIONS, REPLICA_PG_MAX_CONNECTIONS
 import os
 
 load_dotenv('variables.env')
@@ -10,6 +14,24 @@ database_url = os.getenv("DATABASE_URL")
 
 DATABASE_URL = database_url
 
-engine = create_engine(DATABASE_URL)
+# async driver url, derived from DATABASE_URL unless set explicitly
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or make_url(DATABASE_URL).set(drivername="postgresql+asyncpg")
+
+# sync engine, kept for alembic and maintenance scripts. Unpooled so api workers
+# hold nothing idle on it; its connections come out of DB_RESERVED_CONNECTIONS
+engine = create_engine(DATABASE_URL, poolclass=NullPool)
 sessionlocal = sessionmaker(autocommit = False, autoflush = False, bind = engine)
-base = declarative_base()
\ No newline at end of file
+
+# optional read replica for GET requests, see config.db.connection.get_db
+REPLICA_DATABASE_URL = os.getenv("REPLICA_DATABASE_URL")
+ASYNC_REPLICA_DATABASE_URL = os.getenv("ASYNC_REPLICA_DATABASE_URL") or (
+    make_url(REPLICA_DATABASE_URL).set(drivername="postgresql+asyncpg") if REPLICA_DATABASE_URL else None)
+
+# async engine used by the api and its background tasks, its pool sized from config.pool settings
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **pool_options(background=DB_BACKGROUND_CONNECTIONS))
+async_sessionlocal = async_sessionmaker(bind = async_engine, autoflush = False, expire_on_commit = False)
+
+# without a replica, reads go to the primary like everything else
+replica_engine = create_async_engine(ASYNC_REPLICA_DATABASE_URL, **pool_options(max_connections=REPLICA_PG_MAX_CONNECTIONS)) if ASYNC_REPLICA_DATABASE_URL else async_engine
+replica_sessionlocal = async_sessionmaker(bind = replica_engine, autoflush = False, expire_on_commit = False) if ASYNC_REPLICA_DATABASE_URL else async_sessionlocal
+base = declarative_base()
@@ -1,9 +1,64 @@
-from config.config import sessionlocal
+import os
+import time
+from typing import Optional
+from fastapi import Request, Response
+from jose import jwt, JWTError
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from config.config import async_sessionlocal, replica_sessionlocal
+from service.cache import TTLCache
 
+# requests that can be served by the replica
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+# how long a user reads from the primary after a write, to cover replica lag
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "10"))
+# sent with a write's response and echoed back by the client, so the pin holds on
+# every worker. Not a cookie: the frontend is on another origin and its fetches
+# send no credentials. Unsigned, like the token below it only picks a database
+PRIMARY_PIN_HEADER = "X-Read-Primary-Until"
 
-def get_db():
+# users who wrote recently, in this process; the header covers the other workers
+primary_pins = TTLCache(maxsize=10000, ttl=READ_YOUR_WRITES_SECONDS)
+
+
+# user id from the bearer token, only used to pick a database. Not verified:
+# a forged one can at most send its own reads to the primary.
+def request_user_id(request: Request) -> Optional[int]:
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return jwt.get_unverified_claims(token).get("id")
+    except JWTError:
+        return None
+
+
+def pinned_to_primary(request: Request) -> bool:
+    try:
+        if float(request.headers.get(PRIMARY_PIN_HEADER, 0)) > time.time():
+            return True
+    except ValueError:
+        pass
+    user_id = request_user_id(request)
+    return user_id is not None and primary_pins.get(user_id) is not None
+
+
+# called for every successful write request, see main.read_your_writes
+def pin_to_primary(request: Request, response: Response) -> None:
+    user_id = request_user_id(request)
+    if user_id is not None:
+        primary_pins.set(user_id, True)
+    response.headers[PRIMARY_PIN_HEADER] = str(time.time() + READ_YOUR_WRITES_SECONDS)
+
+
+def get_sessionmaker(request: Request) -> async_sessionmaker:
+    if request.method in SAFE_METHODS and not pinned_to_primary(request):
+        return replica_sessionlocal
+    return async_sessionlocal
+
+
+async def get_db(request: Request):
+    db = get_sessionmaker(request)()
     try:
-        db = sessionlocal()
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        await db.close()
@@ -0,0 +1,116 @@
+import bisect
+import os
+import time
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.util.queue import AsyncAdaptedQueue
+from dotenv import load_dotenv
+
+load_dotenv('variables.env')
+
+# how many processes serve the api, and what each postgres server will accept in total
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+PG_MAX_CONNECTIONS = int(os.getenv("PG_MAX_CONNECTIONS", "100"))
+REPLICA_PG_MAX_CONNECTIONS = int(os.getenv("REPLICA_PG_MAX_CONNECTIONS", PG_MAX_CONNECTIONS))
+# left for superuser slots, migrations, commands and psql sessions
+DB_RESERVED_CONNECTIONS = int(os.getenv("DB_RESERVED_CONNECTIONS", "10"))
+# past this an async worker gains nothing from more connections, it only queues in postgres
+DB_MAX_CONNECTIONS_PER_WORKER = int(os.getenv("DB_MAX_CONNECTIONS_PER_WORKER", "30"))
+# taken from each worker's primary pool by its background tasks: the webhook
+# worker and its retry task, and in whichever worker holds the background jobs
+# lock, that lock, the maintenance task and one per outbox dispatcher
+DB_BACKGROUND_CONNECTIONS = int(os.getenv("DB_BACKGROUND_CONNECTIONS", 4 + int(os.getenv("OUTBOX_WORKERS", "4"))))
+
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+
+# upper bounds of the checkout wait histogram, in seconds
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+# split what one postgres server allows between the api workers: per worker,
+# the background tasks' connections plus two thirds of the rest are kept open,
+# and the remaining third is overflow for bursts
+def size_pool(max_connections: int = PG_MAX_CONNECTIONS, workers: int = WEB_CONCURRENCY,
+              reserved: int = DB_RESERVED_CONNECTIONS, background: int = 0) -> tuple:
+    per_worker = (max_connections - reserved) // max(workers, 1) - background
+    if per_worker < 1:
+        raise ValueError(f"{max_connections} connections can't be shared by {workers} workers "
+                         f"with {reserved} reserved and {background} per worker for background tasks")
+    per_worker = min(per_worker, DB_MAX_CONNECTIONS_PER_WORKER)
+    pool_size = max(1, per_worker * 2 // 3)
+    return pool_size + background, per_worker - pool_size
+
+
+# pool settings for one api engine, sized against its own server;
+# DB_POOL_SIZE / DB_MAX_OVERFLOW override the sizing
+def pool_options(max_connections: int = PG_MAX_CONNECTIONS, background: int = 0) -> dict:
+    pool_size, max_overflow = size_pool(max_connections=max_connections, background=background)
+    return {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": int(os.getenv("DB_POOL_SIZE", pool_size)),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", max_overflow)),
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+# the pool's queue of idle connections, reporting how long each get waited
+class TimedQueue(AsyncAdaptedQueue):
+    on_wait = None
+
+    def get(self, block: bool = True, timeout=None):
+        started = time.perf_counter()
+        try:
+            return super().get(block, timeout)
+        finally:
+            if self.on_wait is not None:
+                self.on_wait(time.perf_counter() - started)
+
+
+# queue pool that records how long checkouts waited for an idle connection.
+# Only the wait on the queue is timed: opening an overflow connection, a
+# reconnect after recycle and the pre-ping are postgres latency, not pool pressure
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    _queue_class = TimedQueue
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.wait_histogram = [0] * (len(WAIT_BUCKETS) + 1)
+        self._pool.on_wait = self._record_wait
+
+    def _record_wait(self, wait: float) -> None:
+        self.wait_seconds += wait
+        self.max_wait_seconds = max(self.max_wait_seconds, wait)
+        self.wait_histogram[bisect.bisect_left(WAIT_BUCKETS, wait)] += 1
+
+    def _do_get(self):
+        self.checkouts += 1
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+
+    def stats(self) -> dict:
+        buckets = [f"le_{bound * 1000:g}ms" for bound in WAIT_BUCKETS] + ["inf"]
+        return {
+            "pool_size": self.size(),
+            "max_overflow": self._max_overflow,
+            "timeout": self._timeout,
+            "checked_out": self.checkedout(),
+            "checked_in": self.checkedin(),
+            # overflow() counts down from -pool_size while the pool fills up
+            "overflow": max(self.overflow(), 0),
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "avg_wait_ms": self.wait_seconds / self.checkouts * 1000 if self.checkouts else 0.0,
+            "max_wait_ms": self.max_wait_seconds * 1000,
+            "wait_histogram": dict(zip(buckets, self.wait_histogram)),
+        }
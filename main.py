@@ -1,16 +1,44 @@
-from fastapi import FastAPI
-from router import userRouter, paymentRouter,courseRouter,userCourseRouter
+from fastapi import FastAPI, Request
+from router import userRouter, paymentRouter,courseRouter,userCourseRouter,metricsRouter,reportRouter,dashboardRouter
 from fastapi.middleware.cors import CORSMiddleware
+from contextlib import asynccontextmanager
+from service.stripeClient import close_stripe_client
+from service import paymentWebhook, backgroundJobs
+from config.db.connection import SAFE_METHODS, PRIMARY_PIN_HEADER, pin_to_primary
 
 
 
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # every worker applies the webhooks it received; the outbox and the
+    # maintenance run in only one of them, see service.backgroundJobs
+    paymentWebhook.start_worker()
+    backgroundJobs.start_background_jobs()
+    yield
+    await backgroundJobs.stop_background_jobs()
+    await paymentWebhook.stop_worker()
+    await close_stripe_client()
+
+
+app = FastAPI(lifespan=lifespan)
 app.include_router(userRouter.router, prefix="/user", tags=["User"])
 app.include_router(courseRouter.router, prefix="/course", tags=["Course"])
 app.include_router(paymentRouter.router, prefix="/payment", tags=["Payment"])
 app.include_router(userCourseRouter.router, prefix="/userCourse", tags=["UserCourse"])
+app.include_router(metricsRouter.router, prefix="/metrics", tags=["Metrics"])
+app.include_router(reportRouter.router, prefix="/report", tags=["Report"])
+app.include_router(dashboardRouter.router, prefix="/dashboard", tags=["Dashboard"])
+
+
+# after a write, keep the user's reads on the primary until the replica caught up
+@app.middleware("http")
+async def read_your_writes(request: Request, call_next):
+    response = await call_next(request)
+    if request.method not in SAFE_METHODS and response.status_code < 400:
+        pin_to_primary(request, response)
+    return response
 
 
 app.add_middleware(
@@ -19,4 +47,5 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", PRIMARY_PIN_HEADER],
 )
@@ -1,10 +1,20 @@
 from config.config import base
-from sqlalchemy import Column, Integer, String, Date, Float,ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Date, Float,ForeignKey, Index, Computed
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import relationship, deferred
 
 
 class Course(base):
     __tablename__ = 'courses'
+    __table_args__ = (
+        Index('ix_courses_price_id', 'price', 'id'),
+        Index('ix_courses_start_date_id', 'start_date', 'id'),
+        Index('ix_courses_title_id', 'title', 'id'),
+        Index('ix_courses_category_id', 'category', 'id'),
+        Index('ix_courses_teacher_id_id', 'teacher_id', 'id'),
+        Index('ix_courses_end_date', 'end_date'),
+        Index('ix_courses_search_vector', 'search_vector', postgresql_using='gin'),
+    )
     
     id = Column(Integer, primary_key=True)
     title = Column(String)
@@ -15,6 +25,12 @@ class Course(base):
     end_date = Column(Date)
     teacher_id = Column(Integer,ForeignKey("users.id"))
     video_url = Column(String)
+    # weighted full-text document, maintained by postgres and never loaded with the row
+    search_vector = deferred(Column(TSVECTOR, Computed(
+        "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(category, '')), 'B') || "
+        "setweight(to_tsvector('english', coalesce(description, '')), 'C')",
+        persisted=True)))
     
     user = relationship("User", back_populates="courses")
     payments = relationship("Payment", back_populates="course")
@@ -0,0 +1,31 @@
+from config.config import base
+from sqlalchemy import Column, Integer, Date, Float, Index
+
+
+# completed payment rollups, maintained by the payment triggers. No foreign
+# keys: rows outlive the course or teacher they count, as history
+class CourseDailyStats(base):
+    __tablename__ = 'course_daily_stats'
+    __table_args__ = (
+        Index('ix_course_daily_stats_day', 'day'),
+    )
+    
+    course_id = Column(Integer, primary_key=True)
+    day = Column(Date, primary_key=True)
+    teacher_id = Column(Integer)
+    revenue = Column(Float, nullable=False, default=0)
+    payments = Column(Integer, nullable=False, default=0)
+    enrollments = Column(Integer, nullable=False, default=0)
+
+
+class TeacherDailyStats(base):
+    __tablename__ = 'teacher_daily_stats'
+    __table_args__ = (
+        Index('ix_teacher_daily_stats_day', 'day'),
+    )
+    
+    teacher_id = Column(Integer, primary_key=True)
+    day = Column(Date, primary_key=True)
+    revenue = Column(Float, nullable=False, default=0)
+    payments = Column(Integer, nullable=False, default=0)
+    enrollments = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,15 @@
+from config.config import base
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, func
+from sqlalchemy.dialects.postgresql import JSONB
+
+
+class IdempotencyKey(base):
+    __tablename__ = 'idempotency_key'
+    
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    key = Column(String(255), primary_key=True)
+    request_hash = Column(String(64), nullable=False)
+    # stored response, null while the first request is still running
+    response = Column(JSONB)
+    # when the key was claimed; abandoned claims and expired keys are found by it
+    created_at = Column(DateTime, server_default=func.now(), index=True)
@@ -0,0 +1,28 @@
+from config.config import base
+from sqlalchemy import Column, Integer, String, DateTime, Enum, Index, func, text
+from sqlalchemy.dialects.postgresql import JSONB
+import enum
+
+
+class OutboxStatus(enum.Enum):
+    pending = "pending"
+    done = "done"
+    failed = "failed"
+
+
+# side effects written in the same transaction as the rows they belong to,
+# performed later by the outbox dispatcher
+class OutboxMessage(base):
+    __tablename__ = 'outbox'
+    __table_args__ = (
+        Index('ix_outbox_pending', 'available_at', 'id', postgresql_where=text("status = 'pending'")),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    kind = Column(String, nullable=False)
+    payload = Column(JSONB, nullable=False)
+    status = Column(Enum(OutboxStatus), nullable=False, default=OutboxStatus.pending)
+    attempts = Column(Integer, nullable=False, default=0)
+    available_at = Column(DateTime, nullable=False, server_default=func.now())
+    last_error = Column(String)
+    created_at = Column(DateTime, server_default=func.now())
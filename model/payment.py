@@ -1,5 +1,5 @@
 from config.config import base
-from sqlalchemy import Column, Integer, ForeignKey, Float, DateTime, String, Enum
+from sqlalchemy import Column, Integer, ForeignKey, Float, DateTime, String, Enum, Index, text
 from datetime import datetime
 import enum
 from sqlalchemy.orm import relationship
@@ -21,14 +21,42 @@ class PaymentStatus(enum.Enum):
 
 class Payment(base):
     __tablename__ = "payment"
+    # newest-first keyset pagination per user, per course and overall;
+    # monthly range partitions are created by create_payment_partitions()
+    __table_args__ = (
+        Index('ix_payment_user_id_payment_date_id', 'user_id', 'payment_date', 'id'),
+        Index('ix_payment_course_id_payment_date_id', 'course_id', 'payment_date', 'id'),
+        Index('ix_payment_payment_date_id', 'payment_date', 'id'),
+        {'postgresql_partition_by': 'RANGE (payment_date)'},
+    )
     
-    id = Column(Integer, primary_key=True)
+    id = Column(Integer, primary_key=True, autoincrement=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     course_id = Column(Integer, ForeignKey('courses.id'))
     amount = Column(Float, nullable = False)
-    payment_date = Column(DateTime, default = datetime.now())
+    # partition key, so it is part of the table's primary key
+    payment_date = Column(DateTime, primary_key=True, default = datetime.now)
     payment_method = Column(Enum(PaymentMethod), default = PaymentMethod.stripe)
     status = Column(Enum(PaymentStatus), default = PaymentStatus.pending)
+    stripe_payment_intent_id = Column(String, index=True)
     
     user = relationship("User", back_populates="payments")
-    course = relationship("Course", back_populates="payments")
\ No newline at end of file
+    course = relationship("Course", back_populates="payments")
+
+    # ids come from one sequence, so the id alone still identifies a payment
+    __mapper_args__ = {"primary_key": [id]}
+
+
+# stale pending/failed payments moved out of payment by archive_stale_payments()
+class PaymentArchive(base):
+    __tablename__ = "payment_archive"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, index=True)
+    course_id = Column(Integer)
+    amount = Column(Float, nullable = False)
+    payment_date = Column(DateTime, nullable = False)
+    payment_method = Column(Enum(PaymentMethod))
+    status = Column(Enum(PaymentStatus))
+    stripe_payment_intent_id = Column(String, index=True)
+    archived_at = Column(DateTime, nullable = False, server_default = text("localtimestamp"))
\ No newline at end of file
@@ -0,0 +1,20 @@
+from config.config import base
+from sqlalchemy import Column, String, Integer, DateTime, Index, func, text
+
+
+# stripe webhook events, used to drop redeliveries. An event stays parked
+# (applied_at null) while its payment can't be found, and is retried.
+class StripeEvent(base):
+    __tablename__ = 'stripe_event'
+    __table_args__ = (
+        Index('ix_stripe_event_parked', 'received_at', postgresql_where=text('applied_at IS NULL')),
+    )
+
+    event_id = Column(String, primary_key=True)
+    type = Column(String, nullable=False)
+    received_at = Column(DateTime, server_default=func.now())
+    payment_intent_id = Column(String)
+    # from the intent's metadata, set when the outbox created it
+    payment_id = Column(Integer)
+    applied_at = Column(DateTime)
+    attempts = Column(Integer, nullable=False, server_default='0')
@@ -8,8 +8,8 @@ class User(base):
     __tablename__ = 'users'
     
     id = Column(Integer, primary_key=True)
-    name = Column(String)
-    email = Column(String)
+    name = Column(String, index=True)
+    email = Column(String, index=True)
     password = Column(String)
     role_id: Mapped[Role] = Column(ARRAY(Integer))
     
@@ -6,7 +6,7 @@ class UserCourse(base):
     __tablename__ = 'usercourse'
     
     user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
-    course_id = Column(Integer, ForeignKey('courses.id'), primary_key=True)
+    course_id = Column(Integer, ForeignKey('courses.id'), primary_key=True, index=True)
     
     
     
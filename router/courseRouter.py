@@ -1,7 +1,8 @@
-from fastapi import APIRouter,HTTPException,Depends,status
+from fastapi import APIRouter,HTTPException,Depends,Query,Response,status
 from service.courseServ import CourseServ
-from schema.CourseSch import RequestCourse,CourseResp
-from typing import Annotated
+from service.serialization import JSONBytesResponse
+from schema.CourseSch import RequestCourse,CourseResp,CourseFilter,CourseSearch,CourseSearchHit,CourseExpand,CourseWithTeacher
+from typing import Annotated, Optional
 from sqlalchemy.orm.exc import NoResultFound
 from model.user import User
 from service.userServ import get_current_user
@@ -13,28 +14,36 @@ router = APIRouter()
 user_dependency = Annotated[User,Depends(get_current_user)]
 service_dependency = Annotated[CourseServ,Depends()]
 
-# get all courses end point
-@router.get("/")
+# get all courses end point, one keyset page at a time; ?expand=teacher embeds the teachers
+@router.get("/", response_model=list[CourseWithTeacher], response_model_exclude_none=True)
 @TokenHandler.role_required([Role.ADMIN,Role.TEACHER])
-async def get_all(user: user_dependency,service:service_dependency):
-    if user is None:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
-                            detail="Authentication failed")
+async def get_all(user: user_dependency,service:service_dependency,response: Response,filters: Annotated[CourseFilter,Depends()],expand: Optional[CourseExpand] = None):
     try:
-        _courses = service.get_all()
-        return _courses
+        if expand is None:
+            content, next_cursor = await service.get_all_json(filters=filters)
+            return JSONBytesResponse(content, headers={"X-Next-Cursor": next_cursor} if next_cursor else None)
+        _page = await service.get_all(filters=filters)
+        if _page.next_cursor:
+            response.headers["X-Next-Cursor"] = _page.next_cursor
+        return await service.expand_teachers(_page.items)
     except NoResultFound as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
     
+# full-text course search end point
+@router.get("/search", response_model=list[CourseSearchHit])
+@TokenHandler.role_required([Role.ADMIN,Role.USER,Role.TEACHER])
+async def search(user: user_dependency,service:service_dependency,search: Annotated[CourseSearch,Depends()]):
+    _courses = await service.search(search=search)
+    return _courses
+    
 # get course by id end point
 @router.get("/{course_id}")
 @TokenHandler.role_required([Role.ADMIN,Role.USER,Role.TEACHER])
-async def get_course(user: user_dependency,service:service_dependency, course_id: int):
-    if user is None:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
-                            detail="Authentication failed")
+async def get_course(user: user_dependency,service:service_dependency, course_id: int, expand: Optional[CourseExpand] = None):
     try:
-        _course = service.get_course(course_id=course_id)
+        _course = await service.get_course(course_id=course_id)
+        if expand == "teacher":
+            [_course] = await service.expand_teachers([_course])
         return _course
     except NoResultFound as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
@@ -43,10 +52,7 @@ async def get_course(user: user_dependency,service:service_dependency, course_id
 @router.post("/create")
 @TokenHandler.role_required([Role.ADMIN,Role.TEACHER])
 async def create(user: user_dependency,service:service_dependency, course: RequestCourse):
-    if user is None:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
-                            detail="Authentication failed")
-    _course = service.create_course(course=course)
+    _course = await service.create_course(course=course)
     return _course
     
     
@@ -54,36 +60,24 @@ async def create(user: user_dependency,service:service_dependency, course: Reque
 @router.patch("/update/{course_id}")
 @TokenHandler.role_required([Role.ADMIN,Role.TEACHER])
 async def update(user: user_dependency,service:service_dependency, course_id: int, course: RequestCourse):
-    if user is None:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
-                            detail="Authentication failed")
-    _course = service.update_course(course_id=course_id, course=course)
+    _course = await service.update_course(course_id=course_id, course=course)
     return _course
     
 # delete course end point
 @router.delete("/delete/{course_id}")
 @TokenHandler.role_required([Role.ADMIN,Role.TEACHER])
 async def delete( user: user_dependency,service:service_dependency, course_id: int):
-    if user is None:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
-                            detail="Authentication failed")
-    _course = service.delete_course(course_id=course_id)
+    _course = await service.delete_course(course_id=course_id)
     return _course
 
 @router.get("/my-courses/{user_id}", response_model=list[CourseResp])
 @TokenHandler.role_required([Role.ADMIN,Role.TEACHER,Role.USER])
 async def get_user_courses(user: user_dependency,service:service_dependency, user_id: int):
-    if user is None:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
-                            detail="Authentication failed")
-    _courses = service.get_user_courses(user_id=user_id)
+    _courses = await service.get_user_courses(user_id=user_id)
     return _courses
 
 @router.get("/random-courses/", response_model=list[CourseResp])
 @TokenHandler.role_required([Role.ADMIN,Role.TEACHER,Role.USER])
-async def get_random_courses(user: user_dependency,service:service_dependency):
-    if user is None:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
-                            detail="Authentication failed")
-    _courses = service.get_random_courses()
+async def get_random_courses(user: user_dependency,service:service_dependency,limit: Annotated[int,Query(ge=1, le=20)] = 2):
+    _courses = await service.get_random_courses(limit=limit)
     return _courses
\ No newline at end of file
@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Depends
+from typing import Annotated
+from model.user import User
+from model.role import Role
+from service.userServ import get_current_user
+from service.tokenHandler import TokenHandler
+from service.dashboardServ import DashboardServ
+from schema.dashboardSch import DashboardFilter, DashboardResp
+
+router = APIRouter()
+
+service_dependency = Annotated[DashboardServ,Depends()]
+user_dependency = Annotated[User,Depends(get_current_user)]
+
+# home page end point: catalog page, enrollment count and recommendations in one call
+@router.get("/", response_model=DashboardResp)
+@TokenHandler.role_required([Role.ADMIN,Role.USER,Role.TEACHER])
+async def get_dashboard(user: user_dependency,service: service_dependency,filters: Annotated[DashboardFilter,Depends()]):
+    return await service.get_dashboard(user=user, filters=filters)
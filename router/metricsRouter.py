@@ -0,0 +1,29 @@
+from fastapi import APIRouter, Depends
+from typing import Annotated
+from model.user import User
+from model.role import Role
+from service.userServ import get_current_user
+from service.tokenHandler import TokenHandler
+from service.hashing import hash_pool
+from config.config import async_engine, replica_engine
+
+router = APIRouter()
+
+user_dependency = Annotated[User,Depends(get_current_user)]
+
+# password hashing pool stats end point
+@router.get("/hashing")
+@TokenHandler.role_required([Role.ADMIN])
+async def hashing_stats(user: user_dependency):
+    return hash_pool.stats()
+
+
+
+# database connection pool stats end point
+@router.get("/db")
+@TokenHandler.role_required([Role.ADMIN])
+async def db_pool_stats(user: user_dependency):
+    stats = {"primary": async_engine.pool.stats()}
+    if replica_engine is not async_engine:
+        stats["replica"] = replica_engine.pool.stats()
+    return stats
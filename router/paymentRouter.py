@@ -1,7 +1,7 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Header, Request, Response
 from service.paymentServ import PaymentService
-from schema.paymentSch import PaymentSch, PaymentResp
-from typing import Annotated
+from schema.paymentSch import PaymentSch, PaymentResp, PaymentFilter
+from typing import Annotated, Optional
 from model.payment import PaymentStatus
 from service.tokenHandler import TokenHandler
 from model.role import Role
@@ -15,34 +15,74 @@ user_dependency = Annotated[User,Depends(get_current_user)]
 
 @router.post("/create", response_model=PaymentResp)
 @TokenHandler.role_required([Role.ADMIN,Role.TEACHER,Role.USER])
-async def create_payment(user: user_dependency,payment_data: PaymentSch,service: service_dependency):
-    if user is None:
-        raise HTTPException(status_code=401, detail="Authentication failed")
+async def create_payment(user: user_dependency,payment_data: PaymentSch,service: service_dependency,idempotency_key: Annotated[Optional[str],Header(max_length=255)] = None):
     try:
-        payment = service.create_payment(payment_data=payment_data)
+        payment = await service.create_payment(payment_data=payment_data, user_id=user.id, idempotency_key=idempotency_key)
         return payment
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
+# stripe webhook end point, acknowledged as soon as the event is queued
+@router.post("/webhook")
+async def stripe_webhook(request: Request,stripe_signature: Annotated[Optional[str],Header()] = None):
+    payload = await request.body()
+    queued = PaymentService.enqueue_webhook(payload, stripe_signature)
+    return {"received": True, "queued": queued}
+
+
 @router.post("/update/{payment_id}/status", response_model=PaymentResp)
 @TokenHandler.role_required([Role.ADMIN,Role.TEACHER,Role.USER])
 async def update_payment_status(user:user_dependency,payment_id: int, status: str,service: service_dependency):
-    if user is None:
-        raise HTTPException(status_code=401, detail="Authentication failed")
     payment_status = PaymentStatus[status]  # Convertir el string en un enum de PaymentStatus
-    payment = service.update_payment_status(payment_id, payment_status)
+    payment = await service.update_payment_status(payment_id, payment_status)
     if not payment:
         raise HTTPException(status_code=404, detail="Payment not found")
     return payment
 
 
+# list payments end point; plain users only ever see their own
+@router.get("/", response_model=list[PaymentResp])
+@TokenHandler.role_required([Role.ADMIN,Role.TEACHER,Role.USER])
+async def get_payments(user:user_dependency,service: service_dependency,response: Response,filters: Annotated[PaymentFilter,Depends()]):
+    if Role.ADMIN not in user.role_id and Role.TEACHER not in user.role_id:
+        filters.user_id = user.id
+    page = await service.get_payments(filters=filters)
+    if page.next_cursor:
+        response.headers["X-Next-Cursor"] = page.next_cursor
+    return page.items
+
+
+# payment history of a user end point
+@router.get("/user/{user_id}", response_model=list[PaymentResp])
+@TokenHandler.role_required([Role.ADMIN,Role.TEACHER,Role.USER])
+async def get_user_payments(user:user_dependency,service: service_dependency,response: Response,user_id: int,filters: Annotated[PaymentFilter,Depends()]):
+    if user_id != user.id and Role.ADMIN not in user.role_id and Role.TEACHER not in user.role_id:
+        raise HTTPException(status_code=403, detail="Insufficient privileges")
+    filters.user_id = user_id
+    page = await service.get_payments(filters=filters)
+    if page.next_cursor:
+        response.headers["X-Next-Cursor"] = page.next_cursor
+    return page.items
+
+
+# payments of a course end point
+@router.get("/course/{course_id}", response_model=list[PaymentResp])
+@TokenHandler.role_required([Role.ADMIN,Role.TEACHER])
+async def get_course_payments(user:user_dependency,service: service_dependency,response: Response,course_id: int,filters: Annotated[PaymentFilter,Depends()]):
+    filters.course_id = course_id
+    page = await service.get_payments(filters=filters)
+    if page.next_cursor:
+        response.headers["X-Next-Cursor"] = page.next_cursor
+    return page.items
+
+
 @router.get("/{payment_id}", response_model=PaymentResp)
 @TokenHandler.role_required([Role.ADMIN,Role.TEACHER,Role.USER])
 async def get_payment(user:user_dependency,payment_id: int,service: service_dependency):
-    if user is None:
-        raise HTTPException(status_code=401, detail="Authentication failed")
-    payment = service.get_payment(payment_id)
+    payment = await service.get_payment(payment_id)
     if not payment:
         raise HTTPException(status_code=404, detail="Payment not found")
     return payment
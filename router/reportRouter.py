@@ -0,0 +1,40 @@
+from fastapi import APIRouter, Depends
+from typing import Annotated
+from model.user import User
+from model.role import Role
+from service.userServ import get_current_user
+from service.tokenHandler import TokenHandler
+from service.reportServ import ReportServ
+from schema.reportSch import ReportFilter, TopCoursesFilter, CourseRevenueResp, TeacherRevenueResp, DailyStatsResp
+
+router = APIRouter()
+
+service_dependency = Annotated[ReportServ,Depends()]
+user_dependency = Annotated[User,Depends(get_current_user)]
+
+# revenue per course end point
+@router.get("/revenue/courses", response_model=list[CourseRevenueResp])
+@TokenHandler.role_required([Role.ADMIN])
+async def course_revenue(user: user_dependency,service: service_dependency,filters: Annotated[ReportFilter,Depends()]):
+    return await service.course_revenue(filters=filters)
+
+
+# revenue per teacher end point
+@router.get("/revenue/teachers", response_model=list[TeacherRevenueResp])
+@TokenHandler.role_required([Role.ADMIN])
+async def teacher_revenue(user: user_dependency,service: service_dependency,filters: Annotated[ReportFilter,Depends()]):
+    return await service.teacher_revenue(filters=filters)
+
+
+# enrollments and revenue over time end point
+@router.get("/daily", response_model=list[DailyStatsResp])
+@TokenHandler.role_required([Role.ADMIN])
+async def daily(user: user_dependency,service: service_dependency,filters: Annotated[ReportFilter,Depends()]):
+    return await service.daily(filters=filters)
+
+
+# top courses end point
+@router.get("/top-courses", response_model=list[CourseRevenueResp])
+@TokenHandler.role_required([Role.ADMIN])
+async def top_courses(user: user_dependency,service: service_dependency,filters: Annotated[TopCoursesFilter,Depends()]):
+    return await service.top_courses(filters=filters)
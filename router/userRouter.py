@@ -1,5 +1,5 @@
-from fastapi import APIRouter,HTTPException, Depends,status
-from service.userServ import UserServ,get_current_user
+from fastapi import APIRouter,HTTPException, Depends,Query,status
+from service.userServ import UserServ,get_current_user,TOKEN_EXPIRE_MINUTES
 from schema.userSch import RequestUser,UserResp
 from model.token import Token
 from sqlalchemy.orm.exc import NoResultFound
@@ -7,35 +7,42 @@ from typing import Annotated
 from model.role import Role
 from model.user import User
 from service.tokenHandler import TokenHandler
+from service.serialization import JSONBytesResponse
 from fastapi.security import OAuth2PasswordRequestForm
 from datetime import timedelta
 
 
 router = APIRouter()
 
+MAX_BATCH_IDS = 100
+
 
 service_dependency = Annotated[UserServ,Depends()]
 user_dependency = Annotated[User,Depends(get_current_user)]
 
 # get all users end point
-@router.get("/")
+@router.get("/", response_model=list[UserResp])
 @TokenHandler.role_required([Role.ADMIN])
 async def get_all(user: user_dependency, service: service_dependency):    
-    if user is None:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
-                            detail="Authentication failed")
-    _users = service.get_all()
+    return JSONBytesResponse(await service.get_all_json())
+
+# get several users by id end point, e.g. /user/batch?ids=1,2,3
+@router.get("/batch", response_model=list[UserResp])
+@TokenHandler.role_required([Role.ADMIN,Role.USER,Role.TEACHER])
+async def get_batch(user: user_dependency, service: service_dependency, ids: Annotated[str, Query(pattern=r"^\d+(,\d+)*$")]):
+    user_ids = [int(user_id) for user_id in ids.split(",")]
+    if len(user_ids) > MAX_BATCH_IDS:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                            detail=f"At most {MAX_BATCH_IDS} ids per request")
+    _users = await service.get_users(user_ids=user_ids)
     return _users
 
 # get user by id end point
 @router.get("/{user_id}")
 @TokenHandler.role_required([Role.ADMIN,Role.USER,Role.TEACHER])
 async def get(user: user_dependency, service: service_dependency, user_id: int):
-    if user is None:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
-                            detail="Authentication failed")
     try:    
-        _user = service.get_user(user_id=user_id)
+        _user = await service.get_user(user_id=user_id)
         return _user
     except NoResultFound as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
@@ -44,7 +51,7 @@ async def get(user: user_dependency, service: service_dependency, user_id: int):
 # create user end point
 @router.post("/create")
 async def create(service: service_dependency, user: RequestUser):
-    _user = service.create_user(user=user)
+    _user = await service.create_user(user=user)
     return _user
 
 
@@ -52,10 +59,8 @@ async def create(service: service_dependency, user: RequestUser):
 @router.delete("/delete/{user_id}")
 @TokenHandler.role_required([Role.ADMIN])
 async def delete(user: user_dependency,service: service_dependency, user_id: int):
-    if user is None:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,)
     try:
-        _user = service.delete_user(user_id=user_id)
+        _user = await service.delete_user(user_id=user_id)
         return _user
     except NoResultFound as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
@@ -65,8 +70,10 @@ async def delete(user: user_dependency,service: service_dependency, user_id: int
 @router.patch("/change-password/{user_id}")
 async def changue_password(service: service_dependency,user_id: int,password: str):
     try:
-        _user = service.change_password(user_id=user_id,password=password)
+        _user = await service.change_password(user_id=user_id,password=password)
         return _user
+    except HTTPException:
+        raise
     except:
         raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Something went wrong")
     
@@ -74,8 +81,10 @@ async def changue_password(service: service_dependency,user_id: int,password: st
 @router.patch("/change-email/{user_id}")
 async def changue_password(service: service_dependency,user_id: int,email: str):
     try:
-        _user = service.change_email(user_id=user_id,email=email)
+        _user = await service.change_email(user_id=user_id,email=email)
         return _user
+    except HTTPException:
+        raise
     except:
         raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Something went wrong")
     
@@ -84,16 +93,16 @@ async def changue_password(service: service_dependency,user_id: int,email: str):
     
 @router.post("/token",response_model=Token)
 async def login_for_token(form_data: OAuth2PasswordRequestForm = Depends(), service: UserServ = Depends()):
-    _user = service.auth_user(password=form_data.password, username=form_data.username)
+    _user = await service.auth_user(password=form_data.password, username=form_data.username)
     if not _user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate user")
-    token = service.create_token(user_id=_user.id, username=_user.name, roles=_user.role_id, email=_user.email,expires_delta=timedelta(minutes=30))
+    token = service.create_token(user_id=_user.id, username=_user.name, roles=_user.role_id, email=_user.email,expires_delta=timedelta(minutes=TOKEN_EXPIRE_MINUTES))
     return {'access_token': token, 'token_type': 'bearer'}
     
     
 # update user end point
 @router.patch("/update/{user_id}")
 async def update(service: service_dependency,user_id: int,user: UserResp):
-    _user = service.update_user(user_id=user_id,user=user)
+    _user = await service.update_user(user_id=user_id,user=user)
     return _user
     
\ No newline at end of file
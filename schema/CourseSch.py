@@ -1,5 +1,7 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import date
+from typing import List, Literal, Optional
+from schema.userSch import UserResp
 
 
 class CourseSch(BaseModel):
@@ -34,5 +36,41 @@ class CourseResp(BaseModel):
     
 class RequestCourse(CourseSch):
     pass
-    
-                     
\ No newline at end of file
+
+
+# related objects a course response can embed, via ?expand=
+CourseExpand = Literal["teacher"]
+
+
+class CourseWithTeacher(CourseResp):
+    teacher: Optional[UserResp] = None
+
+
+class CourseFilter(BaseModel):
+    limit: int = Field(50, ge=1, le=200)
+    after: Optional[str] = None
+    category: Optional[str] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    starts_after: Optional[date] = None
+    ends_before: Optional[date] = None
+    teacher_id: Optional[int] = None
+    sort: Literal["id", "price", "start_date", "title"] = "id"
+    order: Literal["asc", "desc"] = "asc"
+
+
+class CoursePage(BaseModel):
+    items: List[CourseResp]
+    next_cursor: Optional[str] = None
+
+
+class CourseSearch(BaseModel):
+    q: str = Field(min_length=1, max_length=200)
+    limit: int = Field(20, ge=1, le=50)
+    offset: int = Field(0, ge=0, le=1000)
+
+
+class CourseSearchHit(CourseResp):
+    rank: float
+    title_highlight: str
+    description_highlight: str
@@ -0,0 +1,15 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from schema.CourseSch import CourseResp, CourseFilter
+
+
+class DashboardFilter(CourseFilter):
+    recommendations: int = Field(2, ge=1, le=20)
+
+
+class DashboardResp(BaseModel):
+    # the /course/ page, only for the roles allowed to list the catalog
+    courses: Optional[List[CourseResp]] = None
+    next_cursor: Optional[str] = None
+    enrolled_count: int
+    recommendations: List[CourseResp]
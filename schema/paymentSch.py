@@ -1,6 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, field_validator
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from enum import Enum
 
 class PaymentMethodEnum(str, Enum):
@@ -25,10 +25,11 @@ class PaymentSch(BaseModel):
         from_attributes = True
         
         
+# user_id and course_id are null once the user or course was deleted
 class PaymentResp(BaseModel):
     id:int
-    user_id: int
-    course_id: int
+    user_id: Optional[int]
+    course_id: Optional[int]
     amount: float
     payment_method: PaymentMethodEnum = PaymentMethodEnum.stripe
     status: PaymentStatusEnum = PaymentStatusEnum.pending
@@ -39,4 +40,27 @@ class PaymentResp(BaseModel):
         
 
 class RequestPayment(PaymentSch):
-    pass
\ No newline at end of file
+    pass
+
+
+class PaymentFilter(BaseModel):
+    limit: int = Field(50, ge=1, le=200)
+    after: Optional[str] = None
+    user_id: Optional[int] = None
+    course_id: Optional[int] = None
+    status: Optional[PaymentStatusEnum] = None
+    date_from: Optional[datetime] = None
+    date_to: Optional[datetime] = None
+
+    # payment_date is a naive local timestamp
+    @field_validator("date_from", "date_to")
+    @classmethod
+    def to_local(cls, value: Optional[datetime]) -> Optional[datetime]:
+        if value is not None and value.tzinfo is not None:
+            return value.astimezone().replace(tzinfo=None)
+        return value
+
+
+class PaymentPage(BaseModel):
+    items: List[PaymentResp]
+    next_cursor: Optional[str] = None
@@ -0,0 +1,36 @@
+from pydantic import BaseModel, Field
+from datetime import date
+from typing import Literal, Optional
+
+
+class ReportFilter(BaseModel):
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+    teacher_id: Optional[int] = None
+    limit: int = Field(50, ge=1, le=500)
+
+
+class CourseRevenueResp(BaseModel):
+    course_id: int
+    teacher_id: Optional[int]
+    revenue: float
+    payments: int
+    enrollments: int
+
+
+class TeacherRevenueResp(BaseModel):
+    teacher_id: int
+    revenue: float
+    payments: int
+    enrollments: int
+
+
+class DailyStatsResp(BaseModel):
+    day: date
+    revenue: float
+    payments: int
+    enrollments: int
+
+
+class TopCoursesFilter(ReportFilter):
+    by: Literal["revenue", "enrollments", "payments"] = "revenue"
@@ -0,0 +1,70 @@
+import asyncio
+import logging
+import os
+from typing import Optional
+from sqlalchemy import text
+from config.config import async_engine
+from service import outbox, paymentMaintenance
+from dotenv import load_dotenv
+
+load_dotenv('variables.env')
+
+# the outbox dispatchers and the payment maintenance run in one process per
+# database, the one holding this session-level advisory lock; the other workers
+# keep trying, so another one takes over when the holder stops or loses its connection
+BACKGROUND_JOBS_LOCK = 7262041
+BACKGROUND_JOBS_CHECK_INTERVAL = float(os.getenv("BACKGROUND_JOBS_CHECK_INTERVAL", "5"))
+
+logger = logging.getLogger(__name__)
+
+
+async def run_background_jobs() -> None:
+    while True:
+        try:
+            async with async_engine.connect() as connection:
+                leader = (await connection.execute(text("SELECT pg_try_advisory_lock(:key)"),
+                                                   {"key": BACKGROUND_JOBS_LOCK})).scalar_one()
+                await connection.commit()
+                if leader:
+                    await lead(connection)
+        except Exception:
+            logger.exception("Background jobs leadership failed")
+        await asyncio.sleep(BACKGROUND_JOBS_CHECK_INTERVAL)
+
+
+# run the jobs for as long as the lock's connection is alive
+async def lead(connection) -> None:
+    logger.info("Running the background jobs in this process")
+    outbox.start_dispatchers()
+    paymentMaintenance.start_maintenance()
+    try:
+        while True:
+            await asyncio.sleep(BACKGROUND_JOBS_CHECK_INTERVAL)
+            await connection.execute(text("SELECT 1"))
+            await connection.commit()
+    finally:
+        await paymentMaintenance.stop_maintenance()
+        await outbox.stop_dispatchers()
+        # the connection goes back to the pool, and the lock would go with it
+        try:
+            await connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": BACKGROUND_JOBS_LOCK})
+            await connection.commit()
+        except Exception:
+            await connection.invalidate()
+
+
+jobs_task: Optional[asyncio.Task] = None
+
+
+def start_background_jobs() -> None:
+    global jobs_task
+    jobs_task = asyncio.create_task(run_background_jobs())
+
+
+async def stop_background_jobs() -> None:
+    global jobs_task
+    if jobs_task is None:
+        return
+    jobs_task.cancel()
+    await asyncio.gather(jobs_task, return_exceptions=True)
+    jobs_task = None
@@ -1,75 +1,248 @@
-from typing import Annotated,List
+from typing import Annotated,List,Optional
 from fastapi.param_functions import Depends
 from fastapi import HTTPException, status
 from model.course import Course
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from config.db.connection import get_db
-from schema.CourseSch import CourseSch,CourseResp
-from model.payment import Payment
-from sqlalchemy import func
+from schema.CourseSch import CourseSch,CourseResp,CourseFilter,CoursePage,CourseSearch,CourseSearchHit,CourseWithTeacher
+from service.userServ import UserServ
+from service.cache import TTLCache
+from service.pagination import encode_cursor, decode_cursor
+from service.serialization import rows_to_json
+from datetime import date
+from model.payment import Payment, PaymentStatus
+from model.userCourse import UserCourse
+from sqlalchemy import func, select, insert, update, delete, tuple_, and_
+import random
+
+
+# columns the catalog can be sorted by; each one is backed by a (column, id) index
+COURSE_SORT_KEYS = {
+    "id": Course.id,
+    "price": Course.price,
+    "start_date": Course.start_date,
+    "title": Course.title,
+}
+COURSE_SORT_PARSERS = {
+    "id": int,
+    "price": float,
+    "start_date": date.fromisoformat,
+    "title": str,
+}
+
+# the columns of CourseResp, returned by every write
+COURSE_COLUMNS = (Course.id, Course.title, Course.description, Course.price, Course.category,
+                  Course.start_date, Course.end_date, Course.teacher_id, Course.video_url)
+
+# hot search results, keyed by normalized query and page
+search_cache = TTLCache(maxsize=256, ttl=60)
+# rounds of random id probes before sampling falls back to an index walk;
+# each round draws twice as many ids as the one before
+RANDOM_PROBE_ROUNDS = 4
 
 
 
 class CourseServ():
-     def __init__(self,db: Annotated[Session,Depends(get_db)]) -> None:
+     def __init__(self,db: Annotated[AsyncSession,Depends(get_db)]) -> None:
         self.db = db
         
-    # get all courses
-     def get_all(self) -> List[Course]:
-        course_list = self.db.query(Course).all()
-        return [CourseResp.model_validate(course) for course in course_list]
+    # get a page of courses, filtered and sorted, using keyset pagination
+     async def get_all(self, filters: CourseFilter = CourseFilter()) -> CoursePage:
+        _, rows, next_cursor = await self._catalog_page(filters)
+        return CoursePage(items=[CourseResp.model_validate(course) for course in rows], next_cursor=next_cursor)
+
+     # the same page as get_all, encoded to JSON straight from the selected columns
+     async def get_all_json(self, filters: CourseFilter = CourseFilter()) -> tuple:
+        keys, rows, next_cursor = await self._catalog_page(filters)
+        return rows_to_json(keys, rows), next_cursor
+
+     # one page of catalog rows, plus the cursor of the next page if there is one
+     async def _catalog_page(self, filters: CourseFilter) -> tuple:
+        keys, rows = [column.key for column in COURSE_COLUMNS], []
+        for keyset in self._keysets(filters):
+            result = await self.db.execute(self._catalog_query(filters, keyset, filters.limit + 1 - len(rows)))
+            rows.extend(result.all())
+            if len(rows) > filters.limit:
+                break
+        next_cursor = None
+        if len(rows) > filters.limit:
+            rows = rows[:filters.limit]
+            next_cursor = encode_cursor([getattr(rows[-1], filters.sort), rows[-1].id])
+        return keys, rows, next_cursor
+
+     # where the page after the cursor starts. postgres sorts nulls last ascending
+     # and first descending, and the row comparison never matches a null sort
+     # value, so a page can continue into (or out of) the courses without one:
+     # the conditions are tried in order until the page is full
+     def _keysets(self, filters: CourseFilter) -> list:
+        if filters.after is None:
+            return [None]
+        sort_column = COURSE_SORT_KEYS[filters.sort]
+        value, course_id = self._parse_cursor(filters.sort, filters.after)
+        if filters.order == "asc":
+            if value is None:
+                return [and_(sort_column.is_(None), Course.id > course_id)]
+            return [tuple_(sort_column, Course.id) > (value, course_id), sort_column.is_(None)]
+        if value is None:
+            return [and_(sort_column.is_(None), Course.id < course_id), sort_column.is_not(None)]
+        return [tuple_(sort_column, Course.id) < (value, course_id)]
+
+     # catalog rows from a keyset condition on, filtered and sorted
+     def _catalog_query(self, filters: CourseFilter, keyset=None, limit: Optional[int] = None):
+        sort_column = COURSE_SORT_KEYS[filters.sort]
+        query = select(*COURSE_COLUMNS)
+        if filters.category is not None:
+            query = query.where(Course.category == filters.category)
+        if filters.teacher_id is not None:
+            query = query.where(Course.teacher_id == filters.teacher_id)
+        if filters.min_price is not None:
+            query = query.where(Course.price >= filters.min_price)
+        if filters.max_price is not None:
+            query = query.where(Course.price <= filters.max_price)
+        if filters.starts_after is not None:
+            query = query.where(Course.start_date >= filters.starts_after)
+        if filters.ends_before is not None:
+            query = query.where(Course.end_date <= filters.ends_before)
+        # (sort_column, id) is compared as a row so the matching index is walked from the cursor on
+        if keyset is not None:
+            query = query.where(keyset)
+        if filters.order == "asc":
+            query = query.order_by(sort_column.asc(), Course.id.asc())
+        else:
+            query = query.order_by(sort_column.desc(), Course.id.desc())
+        return query.limit(filters.limit + 1 if limit is None else limit)
+   
+     @staticmethod
+     def _parse_cursor(sort: str, cursor: str) -> tuple:
+        values = decode_cursor(cursor)
+        try:
+            value, course_id = values
+            # a page can end on a course without a sort value
+            return (None if value is None else COURSE_SORT_PARSERS[sort](value), int(course_id))
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+   
+    # full-text search over title, category and description, ranked and highlighted
+     async def search(self, search: CourseSearch) -> List[CourseSearchHit]:
+        terms = " ".join(search.q.lower().split())
+        cache_key = (terms, search.limit, search.offset)
+        cached = search_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        tsquery = func.websearch_to_tsquery('english', terms)
+        rank = func.ts_rank_cd(Course.search_vector, tsquery)
+        # rank and page on the GIN index first, then build headlines only for the page
+        page = (select(Course.id, rank.label("rank"))
+                .where(Course.search_vector.op("@@")(tsquery))
+                .order_by(rank.desc(), Course.id)
+                .limit(search.limit)
+                .offset(search.offset)
+                .subquery())
+        query = (select(Course, page.c.rank,
+                        func.ts_headline('english', func.coalesce(Course.title, ''), tsquery, 'HighlightAll=true'),
+                        func.ts_headline('english', func.coalesce(Course.description, ''), tsquery, 'MaxFragments=2, MinWords=5, MaxWords=20'))
+                 .join(page, page.c.id == Course.id)
+                 .order_by(page.c.rank.desc(), Course.id))
+        result = await self.db.execute(query)
+        hits = [CourseSearchHit(**CourseResp.model_validate(course).model_dump(),
+                                rank=rank_value,
+                                title_highlight=title_highlight,
+                                description_highlight=description_highlight)
+                for course, rank_value, title_highlight, description_highlight in result.all()]
+        search_cache.set(cache_key, hits)
+        return hits
    
     # get course by id
-     def get_course(self, course_id: int) -> CourseResp:
-        _course = self.db.query(Course).filter(course_id == Course.id).first()
+     async def get_course(self, course_id: int) -> CourseResp:
+        result = await self.db.execute(select(Course).where(course_id == Course.id))
+        _course = result.scalars().first()
         return CourseResp.model_validate(_course)
     
     
     # create course
-     def create_course(self, course: CourseSch) -> CourseResp:
-         _course = Course(**course.model_dump())
-         self.db.add(_course)
-         self.db.commit()
-         self.db.refresh(_course)
-         return CourseResp.model_validate(_course)
+     async def create_course(self, course: CourseSch) -> CourseResp:
+         result = await self.db.execute(insert(Course).values(**course.model_dump()).returning(*COURSE_COLUMNS))
+         _course = CourseResp.model_validate(result.one())
+         await self.db.commit()
+         search_cache.clear()
+         return _course
      
 
     # update course
-     def update_course(self, course_id: int, course: CourseSch) -> CourseResp:
-         _course = self.db.query(Course).filter(Course.id == course_id).first()
-         if not _course:
+     async def update_course(self, course_id: int, course: CourseSch) -> CourseResp:
+         result = await self.db.execute(update(Course)
+                                        .where(Course.id == course_id)
+                                        .values(**course.model_dump())
+                                        .returning(*COURSE_COLUMNS))
+         _course = result.one_or_none()
+         if _course is None:
              raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Course not found")
-         _course.title = course.title
-         _course.description = course.description
-         _course.price = course.price
-         _course.category = course.category
-         _course.start_date = course.start_date
-         _course.end_date = course.end_date
-         _course.teacher_id = course.teacher_id
-         _course.video_url = course.video_url
-         self.db.commit()
-         self.db.refresh(_course)
+         await self.db.commit()
+         search_cache.clear()
          return CourseResp.model_validate(_course)
      
      # delete course
-     def delete_course(self, course_id: int) -> str:
-         _course = self.db.query(Course).filter(Course.id == course_id).first()
-         if not _course:
+     async def delete_course(self, course_id: int) -> str:
+         # detach the course's payments in the same statement, as the ORM delete did
+         detach_payments = update(Payment).where(Payment.course_id == course_id).values(course_id=None).cte("detach_payments")
+         result = await self.db.execute(delete(Course)
+                                        .where(Course.id == course_id)
+                                        .add_cte(detach_payments)
+                                        .returning(Course.id))
+         if result.scalar_one_or_none() is None:
              raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Course not found")
-         self.db.delete(_course)
-         self.db.commit()
+         await self.db.commit()
+         search_cache.clear()
          return f" Course id {course_id} deleted"
      
      
-     def get_user_courses(self, user_id: int) -> list[CourseResp]:
-         _payments = self.db.query(Payment).filter(Payment.user_id == user_id).all()
-    
-         course_ids = [payment.course_id for payment in _payments]
-
-         user_courses = [self.get_course(course_id) for course_id in course_ids]
-
-         return [CourseResp.model_validate(course) for course in user_courses]
+     # embed each course's teacher, all of them loaded with a single IN query
+     async def expand_teachers(self, courses: List[CourseResp]) -> List[CourseWithTeacher]:
+         teachers = {teacher.id: teacher for teacher in await UserServ(self.db).get_users(course.teacher_id for course in courses)}
+         return [CourseWithTeacher(**course.model_dump(), teacher=teachers.get(course.teacher_id)) for course in courses]
+     
+     # courses the user is enrolled in with a completed payment, in one query
+     async def get_user_courses(self, user_id: int) -> list[CourseResp]:
+         completed = select(Payment.id).where(Payment.user_id == UserCourse.user_id,
+                                              Payment.course_id == UserCourse.course_id,
+                                              Payment.status == PaymentStatus.completed).exists()
+         # usercourse is keyed by (user_id, course_id) and exists() is a semi-join,
+         # so every course comes back once no matter how many payments it has
+         result = await self.db.execute(select(Course)
+                                        .join(UserCourse, UserCourse.course_id == Course.id)
+                                        .where(UserCourse.user_id == user_id, completed)
+                                        .order_by(Course.id))
+         return [CourseResp.model_validate(course) for course in result.scalars().all()]
      
-     def get_random_courses(self, limit: int = 2) -> list[CourseResp]:
-        random_courses = self.db.query(Course).order_by(func.random()).limit(limit).all()
-        return [CourseResp.model_validate(course) for course in random_courses]
+     # sample random courses uniformly by rejection: random ids drawn from the
+     # current id range, looked up in the primary key, misses (deleted ids) drawn
+     # again. Every query is an index lookup, so latency does not grow with the table
+     async def get_random_courses(self, limit: int = 2) -> list[CourseResp]:
+        low, high = (await self.db.execute(select(func.min(Course.id), func.max(Course.id)))).one()
+        if low is None:
+            return []
+        found = {}
+        probes = limit * 2
+        for _ in range(RANDOM_PROBE_ROUNDS):
+            needed = limit - len(found)
+            if needed <= 0:
+                break
+            ids = {random.randint(low, high) for _ in range(probes)} - found.keys()
+            result = await self.db.execute(select(*COURSE_COLUMNS).where(Course.id.in_(ids)))
+            hits = result.all()
+            random.shuffle(hits)
+            found.update((row.id, row) for row in hits[:needed])
+            probes *= 2
+        # a very sparse id range: top up with the courses that follow a random id, wrapping around
+        if len(found) < limit:
+            start = random.randint(low, high)
+            for bound in (Course.id >= start, Course.id < start):
+                if len(found) == limit:
+                    break
+                result = await self.db.execute(select(*COURSE_COLUMNS)
+                                               .where(bound, Course.id.not_in(found.keys()))
+                                               .order_by(Course.id).limit(limit - len(found)))
+                found.update((row.id, row) for row in result.all())
+        sample = list(found.values())
+        random.shuffle(sample)
+        return [CourseResp.model_validate(course) for course in sample]
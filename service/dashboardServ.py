@@ -0,0 +1,48 @@
+import asyncio
+from typing import Annotated
+from fastapi.param_functions import Depends
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from config.db.connection import get_sessionmaker
+from model.role import Role
+from schema.CourseSch import CourseFilter, CoursePage
+from schema.dashboardSch import DashboardFilter, DashboardResp
+from schema.userSch import UserResp
+from service.courseServ import CourseServ
+from service.userCourseServ import UserCourseServ
+from service.tokenHandler import TokenHandler
+
+# same roles as GET /course/
+CATALOG_ROLES = TokenHandler.compile_roles([Role.ADMIN, Role.TEACHER])
+
+
+# everything the home page needs, for one already authenticated user.
+# A session can't run two statements at once, so each query gets its own.
+class DashboardServ():
+    def __init__(self,sessionmaker: Annotated[async_sessionmaker,Depends(get_sessionmaker)]) -> None:
+        self.sessionmaker = sessionmaker
+
+    async def get_dashboard(self, user: UserResp, filters: DashboardFilter) -> DashboardResp:
+        enrolled_count = self._enrolled_count(user.id)
+        recommendations = self._recommendations(filters.recommendations)
+        page = None
+        if TokenHandler.check_user_roles(user.role_id, CATALOG_ROLES):
+            catalog = self._catalog(CourseFilter(**filters.model_dump(exclude={"recommendations"})))
+            enrolled_count, recommendations, page = await asyncio.gather(enrolled_count, recommendations, catalog)
+        else:
+            enrolled_count, recommendations = await asyncio.gather(enrolled_count, recommendations)
+        return DashboardResp(courses=page.items if page else None,
+                             next_cursor=page.next_cursor if page else None,
+                             enrolled_count=enrolled_count,
+                             recommendations=recommendations)
+
+    async def _catalog(self, filters: CourseFilter) -> CoursePage:
+        async with self.sessionmaker() as db:
+            return await CourseServ(db).get_all(filters=filters)
+
+    async def _enrolled_count(self, user_id: int) -> int:
+        async with self.sessionmaker() as db:
+            return await UserCourseServ(db).count_user_courses(user_id=user_id)
+
+    async def _recommendations(self, limit: int) -> list:
+        async with self.sessionmaker() as db:
+            return await CourseServ(db).get_random_courses(limit=limit)
@@ -0,0 +1,83 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+bcryptContext = CryptContext(schemes=['bcrypt'], deprecated ='auto')
+
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(os.cpu_count() or 2)))
+HASH_QUEUE_LIMIT = int(os.getenv("HASH_QUEUE_LIMIT", "64"))
+
+
+# bounded thread pool for bcrypt work, so hashing never runs on the event loop.
+# bcrypt releases the GIL while it works, so threads hash in parallel; once
+# queue_limit jobs are in flight new ones get a 503 instead of piling up.
+class HashPool():
+
+    def __init__(self, workers: int, queue_limit: int) -> None:
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        # the timings below are updated from the worker threads
+        self._stats_lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_seconds = 0.0
+        self.run_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    async def run(self, func, *args):
+        if self.in_flight >= self.queue_limit:
+            self.rejected += 1
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                detail="Too many pending password operations",
+                                headers={"Retry-After": "1"})
+        self.in_flight += 1
+        submitted = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, self._timed, submitted, func, args)
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+
+    def _timed(self, submitted: float, func, args):
+        started = time.perf_counter()
+        wait = started - submitted
+        with self._stats_lock:
+            self.wait_seconds += wait
+            self.max_wait_seconds = max(self.max_wait_seconds, wait)
+        try:
+            return func(*args)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._stats_lock:
+                self.run_seconds += elapsed
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            wait_seconds, max_wait_seconds, run_seconds = self.wait_seconds, self.max_wait_seconds, self.run_seconds
+        return {
+            "workers": self.workers,
+            "queue_limit": self.queue_limit,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_wait_ms": wait_seconds / self.completed * 1000 if self.completed else 0.0,
+            "max_wait_ms": max_wait_seconds * 1000,
+            "avg_run_ms": run_seconds / self.completed * 1000 if self.completed else 0.0,
+        }
+
+
+hash_pool = HashPool(workers=HASH_WORKERS, queue_limit=HASH_QUEUE_LIMIT)
+
+
+async def hash_password(password: str) -> str:
+    return await hash_pool.run(bcryptContext.hash, password)
+
+
+async def verify_password(password: str, hashed: str) -> bool:
+    return await hash_pool.run(bcryptContext.verify, password, hashed)
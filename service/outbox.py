@@ -0,0 +1,154 @@
+import asyncio
+import logging
+import os
+import random
+from datetime import timedelta
+from typing import Awaitable, Callable, Dict, List, Optional
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from config.config import async_sessionlocal
+from model.outbox import OutboxMessage, OutboxStatus
+from dotenv import load_dotenv
+
+load_dotenv('variables.env')
+
+OUTBOX_WORKERS = int(os.getenv("OUTBOX_WORKERS", "4"))
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "10"))
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "1"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+OUTBOX_BASE_BACKOFF = float(os.getenv("OUTBOX_BASE_BACKOFF", "1"))
+OUTBOX_MAX_BACKOFF = float(os.getenv("OUTBOX_MAX_BACKOFF", "300"))
+# how long a claimed message is left to its dispatcher before it is due again;
+# longer than a handler can take, stripe's timeouts and retries included
+OUTBOX_LEASE = timedelta(seconds=float(os.getenv("OUTBOX_LEASE_SECONDS", "120")))
+
+logger = logging.getLogger(__name__)
+
+# raised by a handler when retrying can't help
+class PermanentError(Exception):
+    pass
+
+
+Handler = Callable[[AsyncSession, dict], Awaitable[None]]
+
+# kind -> (handler, called once the message gives up)
+handlers: Dict[str, tuple] = {}
+
+
+# handlers make their call out before touching the session, see dispatch
+def register(kind: str, handler: Handler, on_give_up: Optional[Handler] = None) -> None:
+    handlers[kind] = (handler, on_give_up)
+
+
+# add a message to the caller's transaction; it is dispatched after that transaction commits
+def enqueue(db: AsyncSession, kind: str, payload: dict) -> OutboxMessage:
+    message = OutboxMessage(kind=kind, payload=payload, status=OutboxStatus.pending, attempts=0)
+    db.add(message)
+    return message
+
+
+wakeup = asyncio.Event()
+
+
+# nudge the dispatchers of this process instead of waiting for the next poll
+def notify() -> None:
+    wakeup.set()
+
+
+def backoff(attempts: int) -> timedelta:
+    delay = min(OUTBOX_MAX_BACKOFF, OUTBOX_BASE_BACKOFF * 2 ** attempts)
+    return timedelta(seconds=delay * random.uniform(0.5, 1))
+
+
+# lease up to OUTBOX_BATCH_SIZE due messages in a short transaction of their own:
+# they stay pending but become due again only after OUTBOX_LEASE, so a dispatcher
+# that dies mid-batch loses nothing. Times come from the database clock.
+async def claim_batch() -> List[OutboxMessage]:
+    async with async_sessionlocal() as db:
+        due = (select(OutboxMessage.id)
+               .where(OutboxMessage.status == OutboxStatus.pending,
+                      OutboxMessage.available_at <= func.localtimestamp())
+               .order_by(OutboxMessage.available_at, OutboxMessage.id)
+               .limit(OUTBOX_BATCH_SIZE)
+               .with_for_update(skip_locked=True))
+        result = await db.execute(update(OutboxMessage)
+                                  .where(OutboxMessage.id.in_(due.scalar_subquery()))
+                                  .values(available_at=func.localtimestamp() + OUTBOX_LEASE,
+                                          attempts=OutboxMessage.attempts + 1)
+                                  .returning(OutboxMessage)
+                                  .execution_options(synchronize_session=False))
+        messages = sorted(result.scalars().all(), key=lambda message: message.id)
+        await db.commit()
+    return messages
+
+
+# run one leased message. The handler gets a session with no transaction open,
+# so its call out (stripe) holds no locks or connection; the transaction starts
+# with its first statement and commits together with the message's outcome.
+async def dispatch(message: OutboxMessage) -> None:
+    handler, on_give_up = handlers.get(message.kind, (None, None))
+    async with async_sessionlocal() as db:
+        try:
+            if handler is None:
+                raise LookupError(f"No outbox handler for {message.kind}")
+            await handler(db, message.payload)
+            await db.execute(update(OutboxMessage)
+                             .where(OutboxMessage.id == message.id)
+                             .values(status=OutboxStatus.done, last_error=None))
+            await db.commit()
+            return
+        except Exception as e:
+            await db.rollback()
+            error = e
+        outcome = {"last_error": str(error)[:1000]}
+        if isinstance(error, PermanentError) or message.attempts >= OUTBOX_MAX_ATTEMPTS:
+            logger.error("Outbox message %s (%s) gave up after %d attempts", message.id, message.kind, message.attempts)
+            outcome["status"] = OutboxStatus.failed
+            if on_give_up is not None:
+                await on_give_up(db, message.payload)
+        else:
+            outcome["available_at"] = func.localtimestamp() + backoff(message.attempts)
+        await db.execute(update(OutboxMessage).where(OutboxMessage.id == message.id).values(**outcome))
+        await db.commit()
+
+
+# claim a batch and run it; returns how many messages were claimed
+async def dispatch_batch() -> int:
+    messages = await claim_batch()
+    for message in messages:
+        try:
+            await dispatch(message)
+        except Exception:
+            # the lease runs out and another round picks the message up again
+            logger.exception("Failed to record the outcome of outbox message %s", message.id)
+    return len(messages)
+
+
+async def run_dispatcher() -> None:
+    while True:
+        wakeup.clear()
+        try:
+            claimed = await dispatch_batch()
+        except Exception:
+            logger.exception("Outbox dispatch failed")
+            claimed = 0
+        if claimed < OUTBOX_BATCH_SIZE:
+            try:
+                await asyncio.wait_for(wakeup.wait(), OUTBOX_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+
+dispatcher_tasks: List[asyncio.Task] = []
+
+
+def start_dispatchers() -> None:
+    for _ in range(OUTBOX_WORKERS):
+        dispatcher_tasks.append(asyncio.create_task(run_dispatcher()))
+
+
+async def stop_dispatchers() -> None:
+    for task in dispatcher_tasks:
+        task.cancel()
+    await asyncio.gather(*dispatcher_tasks, return_exceptions=True)
+    dispatcher_tasks.clear()
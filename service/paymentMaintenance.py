@@ -0,0 +1,120 @@
+import asyncio
+import logging
+import os
+from datetime import timedelta
+from typing import Optional
+from sqlalchemy import text
+from config.config import async_sessionlocal
+from dotenv import load_dotenv
+
+load_dotenv('variables.env')
+
+PAYMENT_PARTITIONS_AHEAD = int(os.getenv("PAYMENT_PARTITIONS_AHEAD", "3"))
+PAYMENT_ARCHIVE_AFTER_DAYS = int(os.getenv("PAYMENT_ARCHIVE_AFTER_DAYS", "30"))
+PAYMENT_ARCHIVE_CHUNK = int(os.getenv("PAYMENT_ARCHIVE_CHUNK", "1000"))
+PAYMENT_MAINTENANCE_INTERVAL = float(os.getenv("PAYMENT_MAINTENANCE_INTERVAL", "3600"))
+# clients retry with the same Idempotency-Key within minutes; after this the key is forgotten
+IDEMPOTENCY_KEY_TTL_HOURS = int(os.getenv("IDEMPOTENCY_KEY_TTL_HOURS", "24"))
+# finished outbox messages are kept this long for inspection
+OUTBOX_RETENTION_DAYS = int(os.getenv("OUTBOX_RETENTION_DAYS", "7"))
+
+logger = logging.getLogger(__name__)
+
+CREATE_PARTITIONS = text("SELECT create_payment_partitions(localtimestamp, :months_ahead)")
+ARCHIVE_CHUNK = text("SELECT archive_stale_payments(:older_than, :chunk_size)")
+PURGE_IDEMPOTENCY_KEYS = text("""
+    DELETE FROM idempotency_key WHERE (user_id, key) IN (
+        SELECT user_id, key FROM idempotency_key
+        WHERE created_at < now() - :older_than
+        LIMIT :chunk_size
+    )
+""")
+PURGE_OUTBOX = text("""
+    DELETE FROM outbox WHERE id IN (
+        SELECT id FROM outbox
+        WHERE status <> 'pending' AND created_at < now() - :older_than
+        LIMIT :chunk_size
+    )
+""")
+
+
+# make sure the monthly partitions up to PAYMENT_PARTITIONS_AHEAD months out exist
+async def create_partitions() -> int:
+    async with async_sessionlocal() as db:
+        created = (await db.execute(CREATE_PARTITIONS, {"months_ahead": PAYMENT_PARTITIONS_AHEAD})).scalar_one()
+        await db.commit()
+    return created
+
+
+# move one chunk of old pending/failed payments to payment_archive, in its own transaction
+async def archive_chunk() -> int:
+    async with async_sessionlocal() as db:
+        moved = (await db.execute(ARCHIVE_CHUNK, {"older_than": timedelta(days=PAYMENT_ARCHIVE_AFTER_DAYS),
+                                                  "chunk_size": PAYMENT_ARCHIVE_CHUNK})).scalar_one()
+        await db.commit()
+    return moved
+
+
+# delete one chunk of expired idempotency keys
+async def purge_idempotency_keys() -> int:
+    async with async_sessionlocal() as db:
+        purged = (await db.execute(PURGE_IDEMPOTENCY_KEYS, {"older_than": timedelta(hours=IDEMPOTENCY_KEY_TTL_HOURS),
+                                                            "chunk_size": PAYMENT_ARCHIVE_CHUNK})).rowcount
+        await db.commit()
+    return purged
+
+
+# delete one chunk of done and failed outbox messages past their retention
+async def purge_outbox() -> int:
+    async with async_sessionlocal() as db:
+        purged = (await db.execute(PURGE_OUTBOX, {"older_than": timedelta(days=OUTBOX_RETENTION_DAYS),
+                                                  "chunk_size": PAYMENT_ARCHIVE_CHUNK})).rowcount
+        await db.commit()
+    return purged
+
+
+# run a chunked job until a chunk comes back short
+async def drain(job) -> int:
+    total = 0
+    while True:
+        done = await job()
+        total += done
+        if done < PAYMENT_ARCHIVE_CHUNK:
+            return total
+
+
+async def run_maintenance() -> None:
+    while True:
+        try:
+            created = await create_partitions()
+            if created:
+                logger.info("Created %d payment partitions", created)
+            archived = await drain(archive_chunk)
+            if archived:
+                logger.info("Archived %d stale payments", archived)
+            purged = await drain(purge_idempotency_keys)
+            if purged:
+                logger.info("Purged %d expired idempotency keys", purged)
+            purged = await drain(purge_outbox)
+            if purged:
+                logger.info("Purged %d finished outbox messages", purged)
+        except Exception:
+            logger.exception("Payment maintenance failed")
+        await asyncio.sleep(PAYMENT_MAINTENANCE_INTERVAL)
+
+
+maintenance_task: Optional[asyncio.Task] = None
+
+
+def start_maintenance() -> None:
+    global maintenance_task
+    maintenance_task = asyncio.create_task(run_maintenance())
+
+
+async def stop_maintenance() -> None:
+    global maintenance_task
+    if maintenance_task is None:
+        return
+    maintenance_task.cancel()
+    await asyncio.gather(maintenance_task, return_exceptions=True)
+    maintenance_task = None
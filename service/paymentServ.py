@@ -1,73 +1,227 @@
 import stripe
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, delete, tuple_, func
+from sqlalchemy.dialects.postgresql import insert
 from model.payment import Payment, PaymentStatus, PaymentMethod
-from schema.paymentSch import PaymentSch, PaymentResp
-from datetime import datetime
+from model.idempotencyKey import IdempotencyKey
+from schema.paymentSch import PaymentSch, PaymentResp, PaymentFilter, PaymentPage
+from service.pagination import encode_cursor, decode_cursor
+from datetime import datetime, timedelta
 from typing import Optional,Annotated
 from config.db.connection import get_db
 from fastapi.param_functions import Depends
-from dotenv import load_dotenv
+from fastapi import HTTPException, status
+import hashlib
 import os
+from service.stripeClient import get_stripe_client
+from service import outbox
+from service.paymentWebhook import EVENT_STATUS, STRIPE_WEBHOOK_SECRET, PaymentEvent, get_event_queue
+import asyncio
 
-load_dotenv('variables.env')
+PAYMENT_INTENT_CREATE = "payment_intent.create"
+# the columns of PaymentResp, returned by every write
+PAYMENT_COLUMNS = (Payment.id, Payment.user_id, Payment.course_id, Payment.amount, Payment.payment_date,
+                   Payment.payment_method, Payment.status)
+# payment history is read from the partitions of this window first
+RECENT_PAYMENTS_WINDOW = timedelta(days=31)
+# how long a claimed Idempotency-Key may go without a response before it counts as abandoned
+IDEMPOTENCY_LEASE = timedelta(seconds=int(os.getenv("IDEMPOTENCY_LEASE_SECONDS", "60")))
 
-api_key = os.getenv("STRIPE_API_KEY")
 
+# outbox handler: create the stripe payment intent of a committed payment
+async def create_payment_intent(db: AsyncSession, payload: dict) -> None:
+    # Crea un intento de pago con Stripe
+    try:
+        payment_intent = await get_stripe_client().payment_intents.create_async(params={
+            "amount": payload["amount"],
+            "currency": "usd",
+            "payment_method_types": ["card"],
+            "metadata": {
+                "user_id": str(payload["user_id"]),
+                "course_id": str(payload["course_id"]),
+                "payment_id": str(payload["payment_id"])
+            }
+        }, options={"idempotency_key": payload["idempotency_key"]})
+    except (stripe.error.InvalidRequestError, stripe.error.CardError, stripe.error.AuthenticationError) as e:
+        raise outbox.PermanentError(f"Stripe error: {e.user_message}")
+    await db.execute(update(Payment)
+                     .where(Payment.id == payload["payment_id"])
+                     .values(stripe_payment_intent_id=payment_intent.id))
+
+
+# outbox give-up handler: a payment whose intent never got created can't complete
+async def fail_payment(db: AsyncSession, payload: dict) -> None:
+    await db.execute(update(Payment)
+                     .where(Payment.id == payload["payment_id"], Payment.status == PaymentStatus.pending)
+                     .values(status=PaymentStatus.failed))
+
+
+outbox.register(PAYMENT_INTENT_CREATE, create_payment_intent, on_give_up=fail_payment)
 
-stripe.api_key = api_key
 
 class PaymentService:
     
-    def __init__(self,db: Annotated[Session,Depends(get_db)]) -> None:
+    def __init__(self,db: Annotated[AsyncSession,Depends(get_db)]) -> None:
         self.db = db
     
-    def create_payment(self, payment_data: PaymentSch) -> PaymentResp:
-        # Crea un intento de pago con Stripe
+    async def create_payment(self, payment_data: PaymentSch, user_id: Optional[int] = None, idempotency_key: Optional[str] = None) -> PaymentResp:
+        if idempotency_key is not None:
+            request_hash = hashlib.sha256(payment_data.model_dump_json().encode()).hexdigest()
+            replay = await self._claim_idempotency_key(user_id, idempotency_key, request_hash)
+            if replay is not None:
+                return replay
         try:
-            payment_intent = stripe.PaymentIntent.create(
-                amount=int(payment_data.amount * 100),  # Convertir a centavos
-                currency="usd",  
-                payment_method_types=["card"],
-                metadata={
-                    "user_id": payment_data.user_id,
-                    "course_id": payment_data.course_id
-                }
-            )
-
-            # Crea el pago en la base de datos
-            payment = Payment(
-                user_id=payment_data.user_id,
-                course_id=payment_data.course_id,
-                amount=payment_data.amount,
-                payment_method=PaymentMethod.stripe,
-                status=PaymentStatus.pending,
-                payment_date=datetime.now()
-            )
-            self.db.add(payment)
-            self.db.commit()
-            self.db.refresh(payment)
-
-            return PaymentResp.model_validate(payment)
-
-        except stripe.error.StripeError as e:
-            self.db.rollback()
-            raise Exception(f"Stripe error: {e.user_message}")
+            return await self._create_payment(payment_data, user_id, idempotency_key)
+        except Exception:
+            await self.db.rollback()
+            if idempotency_key is not None:
+                # let the client retry with the same key
+                await self.db.execute(delete(IdempotencyKey).where(IdempotencyKey.user_id == user_id,
+                                                                   IdempotencyKey.key == idempotency_key))
+                await self.db.commit()
+            raise
+
+    async def _create_payment(self, payment_data: PaymentSch, user_id: Optional[int], idempotency_key: Optional[str]) -> PaymentResp:
+        # Crea el pago en la base de datos
+        payment = Payment(
+            user_id=payment_data.user_id,
+            course_id=payment_data.course_id,
+            amount=payment_data.amount,
+            payment_method=PaymentMethod.stripe,
+            status=PaymentStatus.pending,
+            payment_date=datetime.now()
+        )
+        self.db.add(payment)
+        await self.db.flush()
+        # the stripe payment intent is created by the outbox dispatcher once this commits
+        outbox.enqueue(self.db, PAYMENT_INTENT_CREATE, {
+            "payment_id": payment.id,
+            "user_id": payment_data.user_id,
+            "course_id": payment_data.course_id,
+            "amount": int(payment_data.amount * 100),  # Convertir a centavos
+            "idempotency_key": f"payment-create-{user_id}-{idempotency_key}" if idempotency_key else f"payment-intent-{payment.id}",
+        })
+        _payment = PaymentResp.model_validate(payment)
+        if idempotency_key is not None:
+            # the cached response commits together with the payment row
+            await self.db.execute(update(IdempotencyKey)
+                                  .where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == idempotency_key)
+                                  .values(response=_payment.model_dump(mode="json")))
+        await self.db.commit()
+        outbox.notify()
+        return _payment
+
+    # claim the key for this request, or return the response stored by an earlier one.
+    # A claim still without a response after IDEMPOTENCY_LEASE belongs to a request
+    # that died before committing, so the same request may take it over.
+    async def _claim_idempotency_key(self, user_id: Optional[int], idempotency_key: str, request_hash: str) -> Optional[PaymentResp]:
+        claim = insert(IdempotencyKey).values(user_id=user_id, key=idempotency_key, request_hash=request_hash)
+        result = await self.db.execute(claim
+                                       .on_conflict_do_update(
+                                           index_elements=[IdempotencyKey.user_id, IdempotencyKey.key],
+                                           set_={"created_at": func.now()},
+                                           where=(IdempotencyKey.response.is_(None)
+                                                  & (IdempotencyKey.request_hash == claim.excluded.request_hash)
+                                                  & (IdempotencyKey.created_at < func.now() - IDEMPOTENCY_LEASE)))
+                                       .returning(IdempotencyKey.key))
+        claimed = result.scalar_one_or_none()
+        await self.db.commit()
+        if claimed is not None:
+            return None
+        result = await self.db.execute(select(IdempotencyKey).where(IdempotencyKey.user_id == user_id,
+                                                                    IdempotencyKey.key == idempotency_key))
+        existing = result.scalars().first()
+        if existing is not None and existing.request_hash != request_hash:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                                detail="Idempotency-Key was already used with a different request")
+        if existing is None or existing.response is None:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT,
+                                detail="A request with this Idempotency-Key is still in progress")
+        return PaymentResp.model_validate(existing.response)
 
     
-    def update_payment_status(self, payment_id: int, status: PaymentStatus) -> Optional[Payment]:
-        payment = self.db.query(Payment).filter(Payment.id == payment_id).first()
-        if not payment:
+    async def update_payment_status(self, payment_id: int, status: PaymentStatus) -> Optional[PaymentResp]:
+        result = await self.db.execute(update(Payment)
+                                       .where(Payment.id == payment_id)
+                                       .values(status=status)
+                                       .returning(*PAYMENT_COLUMNS))
+        payment = result.one_or_none()
+        if payment is None:
             return None
-        
-        payment.status = status
-        self.db.commit()
-        self.db.refresh(payment)
-        return payment
+        await self.db.commit()
+        return PaymentResp.model_validate(payment)
 
 
-    def get_payment(self, payment_id: int) -> PaymentResp:
-        payment = self.db.query(Payment).filter(Payment.id == payment_id).first()
+    # page through payments newest first, keyset on (payment_date, id)
+    async def get_payments(self, filters: PaymentFilter = PaymentFilter()) -> PaymentPage:
+        query = select(Payment)
+        if filters.user_id is not None:
+            query = query.where(Payment.user_id == filters.user_id)
+        if filters.course_id is not None:
+            query = query.where(Payment.course_id == filters.course_id)
+        if filters.status is not None:
+            query = query.where(Payment.status == PaymentStatus[filters.status.value])
+        if filters.date_from is not None:
+            query = query.where(Payment.payment_date >= filters.date_from)
+        if filters.date_to is not None:
+            query = query.where(Payment.payment_date < filters.date_to)
+        newest = None
+        if filters.after is not None:
+            try:
+                payment_date, payment_id = decode_cursor(filters.after)
+                cursor = (datetime.fromisoformat(payment_date), int(payment_id))
+            except (TypeError, ValueError):
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+            newest = cursor[0]
+            # the plain bound lets the planner skip the partitions newer than the cursor
+            query = query.where(tuple_(Payment.payment_date, Payment.id) < cursor, Payment.payment_date <= newest)
+        query = query.order_by(Payment.payment_date.desc(), Payment.id.desc())
+
+        # most pages are filled from the last month or so; only go through the
+        # older partitions when the recent ones don't have a full page
+        recent_from = datetime.now() - RECENT_PAYMENTS_WINDOW
+        payments = []
+        if (newest is None or newest >= recent_from) and (filters.date_to is None or filters.date_to > recent_from):
+            result = await self.db.execute(query.where(Payment.payment_date >= recent_from).limit(filters.limit + 1))
+            payments = list(result.scalars().all())
+        if len(payments) <= filters.limit and (filters.date_from is None or filters.date_from < recent_from):
+            result = await self.db.execute(query.where(Payment.payment_date < recent_from).limit(filters.limit + 1 - len(payments)))
+            payments.extend(result.scalars().all())
+        next_cursor = None
+        if len(payments) > filters.limit:
+            payments = payments[:filters.limit]
+            next_cursor = encode_cursor([payments[-1].payment_date.isoformat(), payments[-1].id])
+        return PaymentPage(items=[PaymentResp.model_validate(payment) for payment in payments], next_cursor=next_cursor)
+
+
+    async def get_payment(self, payment_id: int) -> PaymentResp:
+        result = await self.db.execute(select(Payment).where(Payment.id == payment_id))
+        payment = result.scalars().first()
         if not payment:
             raise Exception("Payment not found")
         return PaymentResp.model_validate(payment)
-    
+
+    # verify a stripe webhook and queue its payment update; the batch worker applies it
+    @staticmethod
+    def enqueue_webhook(payload: bytes, signature: Optional[str]) -> bool:
+        # not configured; stripe keeps retrying until it is
+        if not STRIPE_WEBHOOK_SECRET:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Webhooks are not configured")
+        try:
+            event = stripe.Webhook.construct_event(payload, signature, STRIPE_WEBHOOK_SECRET)
+        except (ValueError, stripe.error.SignatureVerificationError):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid webhook")
+        if event.type not in EVENT_STATUS:
+            return False
+        intent = event.data.object
+        try:
+            payment_id = int(intent.metadata["payment_id"])
+        except (AttributeError, KeyError, TypeError, ValueError):
+            payment_id = None
+        try:
+            get_event_queue().put_nowait(PaymentEvent(event_id=event.id, type=event.type, payment_intent_id=intent.id,
+                                                      payment_id=payment_id))
+        except asyncio.QueueFull:
+            # a non-2xx answer makes stripe deliver the event again later
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Webhook queue full")
+        return True
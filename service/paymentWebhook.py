@@ -0,0 +1,261 @@
+import asyncio
+import logging
+import os
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import delete, func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from config.config import async_sessionlocal
+from model.payment import Payment, PaymentArchive, PaymentStatus
+from model.stripeEvent import StripeEvent
+from dotenv import load_dotenv
+
+load_dotenv('variables.env')
+
+STRIPE_WEBHOOK_SECRET = os.getenv("STRIPE_WEBHOOK_SECRET")
+WEBHOOK_QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", "10000"))
+WEBHOOK_BATCH_SIZE = int(os.getenv("WEBHOOK_BATCH_SIZE", "500"))
+WEBHOOK_BATCH_WINDOW = float(os.getenv("WEBHOOK_BATCH_WINDOW", "0.5"))
+# how often parked events are retried, and after how many tries they are left alone
+WEBHOOK_RETRY_INTERVAL = float(os.getenv("WEBHOOK_RETRY_INTERVAL", "30"))
+WEBHOOK_MAX_ATTEMPTS = int(os.getenv("WEBHOOK_MAX_ATTEMPTS", "50"))
+
+# payment intent events that move a payment, and the status they move it to
+EVENT_STATUS = {
+    "payment_intent.succeeded": PaymentStatus.completed,
+    "payment_intent.payment_failed": PaymentStatus.failed,
+    "payment_intent.canceled": PaymentStatus.failed,
+}
+
+# the columns a payment keeps in payment_archive
+ARCHIVED_COLUMNS = (PaymentArchive.id, PaymentArchive.user_id, PaymentArchive.course_id, PaymentArchive.amount,
+                    PaymentArchive.payment_date, PaymentArchive.payment_method, PaymentArchive.status,
+                    PaymentArchive.stripe_payment_intent_id)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PaymentEvent:
+    event_id: str
+    type: str
+    payment_intent_id: str
+    # our payment id from the intent's metadata; matches before the intent id is stored
+    payment_id: Optional[int] = None
+
+
+event_queue: Optional[asyncio.Queue] = None
+
+
+def get_event_queue() -> asyncio.Queue:
+    global event_queue
+    if event_queue is None:
+        event_queue = asyncio.Queue(maxsize=WEBHOOK_QUEUE_SIZE)
+    return event_queue
+
+
+def event_rows(events: Iterable[PaymentEvent]) -> List[dict]:
+    return [{"event_id": event.event_id, "type": event.type, "payment_intent_id": event.payment_intent_id,
+             "payment_id": event.payment_id} for event in events]
+
+
+# event id -> id of the payment it is about, for the events whose payment exists
+async def find_payments(db: AsyncSession, events: List[PaymentEvent]) -> Dict[str, int]:
+    payment_ids = {event.payment_id for event in events if event.payment_id is not None}
+    intent_ids = {event.payment_intent_id for event in events}
+    result = await db.execute(select(Payment.id, Payment.stripe_payment_intent_id)
+                              .where(or_(Payment.id.in_(payment_ids), Payment.stripe_payment_intent_id.in_(intent_ids))))
+    found, by_intent = set(), {}
+    for payment_id, intent_id in result.all():
+        found.add(payment_id)
+        if intent_id is not None:
+            by_intent[intent_id] = payment_id
+    matches = {}
+    for event in events:
+        payment_id = event.payment_id if event.payment_id in found else by_intent.get(event.payment_intent_id)
+        if payment_id is not None:
+            matches[event.event_id] = payment_id
+    return matches
+
+
+# move archived payments the events are about back into payment, so a late event still applies
+async def restore_archived(db: AsyncSession, events: List[PaymentEvent]) -> None:
+    payment_ids = {event.payment_id for event in events if event.payment_id is not None}
+    intent_ids = {event.payment_intent_id for event in events}
+    columns = [column.key for column in ARCHIVED_COLUMNS]
+    restored = (delete(PaymentArchive)
+                .where(or_(PaymentArchive.id.in_(payment_ids), PaymentArchive.stripe_payment_intent_id.in_(intent_ids)))
+                .returning(*ARCHIVED_COLUMNS)
+                .cte("restored"))
+    await db.execute(insert(Payment).from_select(columns, select(*[restored.c[column] for column in columns])))
+
+
+# apply a batch of events in one transaction: record them, find their payments,
+# then one UPDATE per target status. An event only counts as applied once its
+# payment was found; the intent id is stored by the outbox dispatcher after the
+# payment committed, so an early event stays parked and retry_parked tries it again
+async def apply_batch(events: List[PaymentEvent]) -> int:
+    unique = {event.event_id: event for event in events}
+    async with async_sessionlocal() as db:
+        await db.execute(insert(StripeEvent).values(event_rows(unique.values())).on_conflict_do_nothing())
+        # redeliveries of applied events drop out here, parked ones come back in
+        result = await db.execute(select(StripeEvent.event_id)
+                                  .where(StripeEvent.event_id.in_(list(unique)), StripeEvent.applied_at.is_(None))
+                                  .with_for_update(skip_locked=True))
+        pending = [unique[event_id] for event_id in result.scalars().all()]
+        if not pending:
+            await db.commit()
+            return 0
+        matches = await find_payments(db, pending)
+        unmatched = [event for event in pending if event.event_id not in matches]
+        if unmatched:
+            await restore_archived(db, unmatched)
+            matches.update(await find_payments(db, unmatched))
+        # a success anywhere in the batch wins over a failure for the same payment
+        targets = {}
+        for event in pending:
+            payment_id = matches.get(event.event_id)
+            if payment_id is not None and targets.get(payment_id) != PaymentStatus.completed:
+                targets[payment_id] = EVENT_STATUS[event.type]
+        completed = [payment_id for payment_id, new_status in targets.items() if new_status == PaymentStatus.completed]
+        failed = [payment_id for payment_id, new_status in targets.items() if new_status == PaymentStatus.failed]
+        updated = 0
+        if completed:
+            result = await db.execute(update(Payment)
+                                      .where(Payment.id.in_(completed),
+                                             Payment.status != PaymentStatus.completed)
+                                      .values(status=PaymentStatus.completed))
+            updated += result.rowcount
+        if failed:
+            # completed is terminal, only pending payments can fail
+            result = await db.execute(update(Payment)
+                                      .where(Payment.id.in_(failed),
+                                             Payment.status == PaymentStatus.pending)
+                                      .values(status=PaymentStatus.failed))
+            updated += result.rowcount
+        if matches:
+            await db.execute(update(StripeEvent)
+                             .where(StripeEvent.event_id.in_(list(matches)))
+                             .values(applied_at=func.now()))
+        still_parked = [event.event_id for event in pending if event.event_id not in matches]
+        if still_parked:
+            await count_attempts(db, still_parked)
+        await db.commit()
+    return updated
+
+
+async def count_attempts(db: AsyncSession, event_ids: List[str]) -> None:
+    result = await db.execute(update(StripeEvent)
+                              .where(StripeEvent.event_id.in_(event_ids))
+                              .values(attempts=StripeEvent.attempts + 1)
+                              .returning(StripeEvent.event_id, StripeEvent.attempts))
+    for event_id, attempts in result.all():
+        if attempts == WEBHOOK_MAX_ATTEMPTS:
+            logger.error("Giving up on stripe event %s after %d attempts, no payment matches it", event_id, attempts)
+
+
+# record events that couldn't be applied, in their own transaction, so retry_parked picks them up
+async def park(events: List[PaymentEvent]) -> None:
+    unique = {event.event_id: event for event in events}
+    async with async_sessionlocal() as db:
+        await db.execute(insert(StripeEvent).values(event_rows(unique.values())).on_conflict_do_nothing())
+        await count_attempts(db, list(unique))
+        await db.commit()
+
+
+# parked events that are due for another try, oldest first
+async def parked_events() -> List[PaymentEvent]:
+    async with async_sessionlocal() as db:
+        result = await db.execute(select(StripeEvent)
+                                  .where(StripeEvent.applied_at.is_(None), StripeEvent.attempts < WEBHOOK_MAX_ATTEMPTS)
+                                  .order_by(StripeEvent.received_at)
+                                  .limit(WEBHOOK_BATCH_SIZE))
+        return [PaymentEvent(event_id=event.event_id, type=event.type, payment_intent_id=event.payment_intent_id,
+                             payment_id=event.payment_id)
+                for event in result.scalars().all()]
+
+
+async def retry_parked() -> None:
+    while True:
+        await asyncio.sleep(WEBHOOK_RETRY_INTERVAL)
+        events = []
+        try:
+            events = await parked_events()
+            if events:
+                await apply_batch(events)
+        except Exception:
+            logger.exception("Failed to retry %d parked payment events", len(events))
+            if events:
+                try:
+                    await park(events)
+                except Exception:
+                    logger.exception("Failed to count the attempt of %d parked payment events", len(events))
+
+
+# take everything that arrives within the batch window, up to the batch size
+async def next_batch(queue: asyncio.Queue) -> List[PaymentEvent]:
+    batch = [await queue.get()]
+    deadline = asyncio.get_running_loop().time() + WEBHOOK_BATCH_WINDOW
+    while len(batch) < WEBHOOK_BATCH_SIZE:
+        timeout = deadline - asyncio.get_running_loop().time()
+        if timeout <= 0:
+            break
+        try:
+            batch.append(await asyncio.wait_for(queue.get(), timeout))
+        except asyncio.TimeoutError:
+            break
+    return batch
+
+
+async def run_worker() -> None:
+    queue = get_event_queue()
+    retry: List[PaymentEvent] = []
+    while True:
+        # the webhook was already acknowledged to stripe, so a batch is only let go once it is stored
+        batch = retry or await next_batch(queue)
+        try:
+            await apply_batch(batch)
+        except Exception:
+            logger.exception("Failed to apply %d payment events, parking them for retry", len(batch))
+            try:
+                await park(batch)
+            except Exception:
+                logger.exception("Failed to park %d payment events, retrying", len(batch))
+                retry = batch
+                await asyncio.sleep(1)
+                continue
+        retry = []
+        for _ in batch:
+            queue.task_done()
+
+
+worker_task: Optional[asyncio.Task] = None
+retry_task: Optional[asyncio.Task] = None
+
+
+def start_worker() -> None:
+    global worker_task, retry_task
+    # without the secret no webhook can be verified, the endpoint answers 503;
+    # the rest of the api (local dev, the load test) runs without it
+    if not STRIPE_WEBHOOK_SECRET:
+        logger.warning("STRIPE_WEBHOOK_SECRET is not set, stripe webhooks are disabled")
+        return
+    worker_task = asyncio.create_task(run_worker())
+    retry_task = asyncio.create_task(retry_parked())
+
+
+# flush what is already queued, then stop the worker
+async def stop_worker(timeout: float = 10) -> None:
+    global worker_task, retry_task
+    if worker_task is None:
+        return
+    try:
+        await asyncio.wait_for(get_event_queue().join(), timeout)
+    except asyncio.TimeoutError:
+        logger.warning("Stopping webhook worker with %d events still queued", get_event_queue().qsize())
+    worker_task.cancel()
+    retry_task.cancel()
+    await asyncio.gather(worker_task, retry_task, return_exceptions=True)
+    worker_task = None
+    retry_task = None
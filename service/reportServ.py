@@ -0,0 +1,66 @@
+from typing import Annotated, List
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select
+from fastapi.param_functions import Depends
+from config.db.connection import get_db
+from model.dailyStats import CourseDailyStats, TeacherDailyStats
+from schema.reportSch import ReportFilter, TopCoursesFilter, CourseRevenueResp, TeacherRevenueResp, DailyStatsResp
+
+
+# reads only the rollup tables, so cost follows the size of the range, not the payment history
+class ReportServ():
+    def __init__(self,db: Annotated[AsyncSession,Depends(get_db)]) -> None:
+        self.db = db
+
+    @staticmethod
+    def _in_range(query, table, filters: ReportFilter):
+        if filters.date_from is not None:
+            query = query.where(table.day >= filters.date_from)
+        if filters.date_to is not None:
+            query = query.where(table.day <= filters.date_to)
+        if filters.teacher_id is not None:
+            query = query.where(table.teacher_id == filters.teacher_id)
+        return query
+
+    # revenue per course
+    async def course_revenue(self, filters: ReportFilter) -> List[CourseRevenueResp]:
+        return await self.top_courses(TopCoursesFilter(**filters.model_dump(), by="revenue"))
+
+    # best selling courses, ranked by revenue, enrollments or payments
+    async def top_courses(self, filters: TopCoursesFilter) -> List[CourseRevenueResp]:
+        totals = {
+            "revenue": func.sum(CourseDailyStats.revenue),
+            "payments": func.sum(CourseDailyStats.payments),
+            "enrollments": func.sum(CourseDailyStats.enrollments),
+        }
+        query = select(CourseDailyStats.course_id,
+                       func.max(CourseDailyStats.teacher_id).label("teacher_id"),
+                       *(total.label(name) for name, total in totals.items()))
+        query = self._in_range(query, CourseDailyStats, filters)
+        query = query.group_by(CourseDailyStats.course_id).order_by(totals[filters.by].desc(), CourseDailyStats.course_id).limit(filters.limit)
+        result = await self.db.execute(query)
+        return [CourseRevenueResp.model_validate(row._mapping) for row in result.all()]
+
+    # revenue per teacher
+    async def teacher_revenue(self, filters: ReportFilter) -> List[TeacherRevenueResp]:
+        revenue = func.sum(TeacherDailyStats.revenue)
+        query = select(TeacherDailyStats.teacher_id,
+                       revenue.label("revenue"),
+                       func.sum(TeacherDailyStats.payments).label("payments"),
+                       func.sum(TeacherDailyStats.enrollments).label("enrollments"))
+        query = self._in_range(query, TeacherDailyStats, filters)
+        query = query.group_by(TeacherDailyStats.teacher_id).order_by(revenue.desc(), TeacherDailyStats.teacher_id).limit(filters.limit)
+        result = await self.db.execute(query)
+        return [TeacherRevenueResp.model_validate(row._mapping) for row in result.all()]
+
+    # revenue and enrollments per day, from the course rollup since teacher_daily_stats
+    # leaves out courses without a teacher
+    async def daily(self, filters: ReportFilter) -> List[DailyStatsResp]:
+        query = select(CourseDailyStats.day,
+                       func.sum(CourseDailyStats.revenue).label("revenue"),
+                       func.sum(CourseDailyStats.payments).label("payments"),
+                       func.sum(CourseDailyStats.enrollments).label("enrollments"))
+        query = self._in_range(query, CourseDailyStats, filters)
+        query = query.group_by(CourseDailyStats.day).order_by(CourseDailyStats.day.desc()).limit(filters.limit)
+        result = await self.db.execute(query)
+        return [DailyStatsResp.model_validate(row._mapping) for row in result.all()]
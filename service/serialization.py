@@ -0,0 +1,44 @@
+import os
+from typing import Iterable, Sequence
+import orjson
+from fastapi import Response
+from sqlalchemy import Select, Text, cast, func, select, text
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.ext.asyncio import AsyncSession
+from dotenv import load_dotenv
+
+load_dotenv('variables.env')
+
+# have postgres build list responses with json_agg instead of encoding rows in python
+JSON_AGG_RESPONSES = os.getenv("JSON_AGG_RESPONSES", "false").lower() == "true"
+
+
+# already encoded JSON; returning one skips FastAPI's response_model validation and encoding
+class JSONBytesResponse(Response):
+    media_type = "application/json"
+
+
+# encode selected rows as a JSON array of objects, with no ORM or pydantic object per row.
+# orjson handles the column types we return (dates, datetimes, enums, int arrays) natively.
+def rows_to_json(keys: Sequence[str], rows: Iterable[tuple]) -> bytes:
+    keys = list(keys)
+    return orjson.dumps([dict(zip(keys, row)) for row in rows])
+
+
+# the whole result of query as one JSON array, built by postgres; the selected
+# column names become the object keys, as they do in rows_to_json
+def json_agg_query(query: Select, *order_by: str) -> Select:
+    items = query.subquery("items")
+    aggregated = func.json_agg(aggregate_order_by(items.table_valued(), *(items.c[key] for key in order_by))
+                               if order_by else items.table_valued())
+    return select(cast(func.coalesce(aggregated, text("'[]'::json")), Text))
+
+
+# run a column query and return its rows as a JSON array, in the configured mode
+async def select_json(db: AsyncSession, query: Select, *order_by: str) -> bytes:
+    if JSON_AGG_RESPONSES:
+        # one text value for the whole response, no python object per row
+        result = await db.execute(json_agg_query(query, *order_by))
+        return result.scalar_one().encode()
+    result = await db.execute(query.order_by(*(query.selected_columns[key] for key in order_by)))
+    return rows_to_json(result.keys(), result.all())
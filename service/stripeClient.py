@@ -0,0 +1,52 @@
+import os
+from typing import Optional
+import httpx
+import stripe
+from dotenv import load_dotenv
+
+load_dotenv('variables.env')
+
+STRIPE_API_KEY = os.getenv("STRIPE_API_KEY")
+STRIPE_CONNECT_TIMEOUT = float(os.getenv("STRIPE_CONNECT_TIMEOUT", "3"))
+STRIPE_READ_TIMEOUT = float(os.getenv("STRIPE_READ_TIMEOUT", "10"))
+STRIPE_MAX_CONNECTIONS = int(os.getenv("STRIPE_MAX_CONNECTIONS", "20"))
+STRIPE_MAX_RETRIES = int(os.getenv("STRIPE_MAX_RETRIES", "2"))
+
+
+# stripe's httpx client with an explicit keep-alive pool. HTTPXClient takes no
+# limits, so its AsyncClient is replaced by one with the same verify setting;
+# the replaced one never sent a request and is closed together with ours
+class PooledHTTPXClient(stripe.HTTPXClient):
+    def __init__(self, timeout: httpx.Timeout, limits: httpx.Limits, **kwargs) -> None:
+        super().__init__(timeout=timeout, **kwargs)
+        self._default_client_async = self._client_async
+        verify = stripe.ca_bundle_path if self._verify_ssl_certs else False
+        self._client_async = httpx.AsyncClient(verify=verify, limits=limits)
+
+    async def close_async(self) -> None:
+        await self._default_client_async.aclose()
+        await self._client_async.aclose()
+
+
+stripe_client: Optional[stripe.StripeClient] = None
+stripe_http_client: Optional[stripe.HTTPClient] = None
+
+
+# shared async stripe client, created on first use; pass http_client to swap the transport
+def get_stripe_client(http_client: Optional[stripe.HTTPClient] = None) -> stripe.StripeClient:
+    global stripe_client, stripe_http_client
+    if stripe_client is None or http_client is not None:
+        stripe_http_client = http_client or PooledHTTPXClient(
+            timeout=httpx.Timeout(STRIPE_READ_TIMEOUT, connect=STRIPE_CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=STRIPE_MAX_CONNECTIONS, max_keepalive_connections=STRIPE_MAX_CONNECTIONS),
+        )
+        stripe_client = stripe.StripeClient(STRIPE_API_KEY, http_client=stripe_http_client, max_network_retries=STRIPE_MAX_RETRIES)
+    return stripe_client
+
+
+async def close_stripe_client() -> None:
+    global stripe_client, stripe_http_client
+    if stripe_http_client is not None:
+        await stripe_http_client.close_async()
+    stripe_client = None
+    stripe_http_client = None
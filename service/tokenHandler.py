@@ -1,4 +1,4 @@
-from typing import Annotated
+from typing import Annotated, Iterable
 from fastapi import HTTPException, status
 from typing import List
 from functools import wraps
@@ -12,34 +12,28 @@ user_dependency = Annotated[UserResp,Depends(get_current_user)]
 class TokenHandler():
 
     @staticmethod
-    def check_user_roles(role_id: List[int]  , required_roles: List[Role]) -> bool:  
-         if any(role in required_roles for role in role_id):
-            return True
-         else:
-             return False
+    def compile_roles(required_roles: Iterable[Role]) -> frozenset:
+        return frozenset(int(role) for role in required_roles)
+
+    @staticmethod
+    def check_user_roles(role_id: List[int]  , required_roles: frozenset) -> bool:  
+         return not required_roles.isdisjoint(role_id)
     
     
     def role_required(required_roles: List[Role]): 
+        # the policy is compiled once, when the route is registered
+        allowed = TokenHandler.compile_roles(required_roles)
         def decorator(func):
             @wraps(func)
             async def wrapper(user: user_dependency,*args, **kwargs):
                if user is None:
                    raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
                                 detail="Authentication failed")
-               token: dict = user
-               if token is None:
-                    raise HTTPException(
-                        status_code=status.HTTP_401_UNAUTHORIZED,
-                        detail="Token not provided",
-                    )
-               user_roles = user.role_id
-               print(user_roles)
-               print(required_roles)
-               if not TokenHandler.check_user_roles(user_roles, required_roles):
+               if allowed.isdisjoint(user.role_id):
                     raise HTTPException(
                         status_code=status.HTTP_403_FORBIDDEN,
                         detail="Insufficient privileges",
                     )
                return await func(user,*args, **kwargs)
             return wrapper
-        return decorator
\ No newline at end of file
+        return decorator
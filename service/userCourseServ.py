@@ -1,30 +1,33 @@
 from typing import Annotated,List
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select
 from config.db.connection import get_db
 from fastapi.param_functions import Depends
 from model.userCourse import UserCourse
 from schema.userCourseSch import UserCourseResp
+from service.serialization import select_json
 from fastapi import HTTPException, status
 
 
 class UserCourseServ():
-    def __init__(self,db: Annotated[Session,Depends(get_db)]) -> None:
+    def __init__(self,db: Annotated[AsyncSession,Depends(get_db)]) -> None:
         self.db = db
         
     # get user courses by id
-    def get_user_courses(self, user_id: int) -> List[UserCourseResp]:
-        _courses = self.db.query(UserCourse).filter(UserCourse.user_id == user_id).all()
+    async def get_user_courses(self, user_id: int) -> List[UserCourseResp]:
+        result = await self.db.execute(select(UserCourse).where(UserCourse.user_id == user_id))
+        _courses = result.scalars().all()
         if not _courses:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Data not found")
         return [UserCourseResp.model_validate(userCourse) for userCourse in _courses]
     
     
-    # get all user courses
-    def get_all(self) -> List[UserCourseResp]:
-        _courses = self.db.query(UserCourse).all()
-        return [UserCourseResp.model_validate(userCourse) for userCourse in _courses]
+    # get all user courses as JSON, without building an object per enrollment
+    async def get_all_json(self) -> bytes:
+        return await select_json(self.db, select(UserCourse.user_id, UserCourse.course_id), "user_id", "course_id")
     
     
-    def count_user_courses(self, user_id: int) -> int:
-        _user_course = self.db.query(UserCourse).filter(UserCourse.user_id == user_id).count()
-        return _user_course
\ No newline at end of file
+    async def count_user_courses(self, user_id: int) -> int:
+        result = await self.db.execute(select(func.count()).select_from(UserCourse).where(UserCourse.user_id == user_id))
+        _user_course = result.scalar_one()
+        return _user_course
@@ -1,114 +1,168 @@
 from typing import Annotated
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, insert, update, delete
 from fastapi.param_functions import Depends
 from fastapi import HTTPException, status
-from passlib.context import CryptContext
 from model.user import User
+from model.course import Course
+from model.payment import Payment
 from config.db.connection import get_db
 from schema.userSch import UserSch,UserResp
-from typing import List
+from service.cache import TTLCache
+from service.serialization import select_json
+from service.hashing import hash_password, verify_password
+from pydantic import ValidationError
+from typing import Iterable, List, Optional
 from sqlalchemy.orm.exc import NoResultFound
 from fastapi.security import OAuth2PasswordBearer
 from datetime import datetime, timedelta
 from jose import jwt
 from dotenv import load_dotenv
 import os
+import time
 
 load_dotenv('variables.env')
 
 secret = os.getenv("SECRET_KEY")
 algo = os.getenv("ALGORITH")
 
-bcryptContext = CryptContext(schemes=['bcrypt'], deprecated ='auto')
 SECRET_KEY = secret
 ALGORITH = algo
 oauth_bearer = OAuth2PasswordBearer(tokenUrl='user/token')
 
+# build the principal straight from the signed token claims instead of loading the user.
+# Revocation is per process: invalidate_user only reaches the worker that made the
+# change, so in the other workers a demoted or deleted user keeps the old roles until
+# the token expires (TOKEN_EXPIRE_MINUTES). Only enable it if that window is acceptable.
+STATELESS_AUTH = os.getenv("STATELESS_AUTH", "false").lower() == "true"
+USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", "60"))
+TOKEN_EXPIRE_MINUTES = 30
+
+# the columns of UserResp, returned by every write
+USER_COLUMNS = (User.id, User.name, User.email, User.role_id)
+
+# user records resolved by get_current_user. Like stale_claims it lives in this
+# process only: other workers serve a changed user from their own copy for up to
+# USER_CACHE_TTL seconds, which is the accepted delay for role changes and deletes
+user_cache = TTLCache(maxsize=10000, ttl=USER_CACHE_TTL)
+# when each user last changed; claims signed before that are no longer trusted
+stale_claims = TTLCache(maxsize=10000, ttl=TOKEN_EXPIRE_MINUTES * 60)
+
+
+# drop cached data for a user after it changes, in this process
+def invalidate_user(user_id: int) -> None:
+    user_cache.invalidate(user_id)
+    stale_claims.set(user_id, time.time())
+
 
 class UserServ():
     
-    def __init__(self,db: Annotated[Session,Depends(get_db)]) -> None:
+    def __init__(self,db: Annotated[AsyncSession,Depends(get_db)]) -> None:
         self.db = db
         
-    # Get all users   
-    def get_all(self) -> List[UserResp]:
-        user_list = self.db.query(User).all()
-        return [UserResp.model_validate(user) for user in user_list]	
+    # Get all users as JSON, without building an object per user
+    async def get_all_json(self) -> bytes:
+        return await select_json(self.db, select(*USER_COLUMNS), "id")
         
     # Get user by id
-    def get_user(self, user_id: int) -> UserResp:
-        _user = self.db.query(User).filter(User.id == user_id).first()
-        if not _user:
+    async def get_user(self, user_id: int) -> UserResp:
+        _user = await self.find_user(user_id)
+        if _user is None:
             raise NoResultFound
-        return UserResp.model_validate(_user)
+        return _user
+
+    # the user, or None if there is no such user (any more)
+    async def find_user(self, user_id: int) -> Optional[UserResp]:
+        result = await self.db.execute(select(*USER_COLUMNS).where(User.id == user_id))
+        _user = result.one_or_none()
+        return UserResp.model_validate(_user) if _user is not None else None
+    
+    
+    # Get several users with one IN query, reading through the user cache
+    async def get_users(self, user_ids: Iterable[int]) -> List[UserResp]:
+        user_ids = list(dict.fromkeys(user_ids))
+        users = {}
+        missing = []
+        for user_id in user_ids:
+            cached = user_cache.get(user_id)
+            if cached is None:
+                missing.append(user_id)
+            else:
+                users[user_id] = cached
+        if missing:
+            result = await self.db.execute(select(User).where(User.id.in_(missing)))
+            for _user in result.scalars().all():
+                users[_user.id] = UserResp.model_validate(_user)
+                user_cache.set(_user.id, users[_user.id])
+        return [users[user_id] for user_id in user_ids if user_id in users]
     
     
     # Create new user
-    def create_user(self,user:UserSch) -> UserResp:
-        hashed_password = bcryptContext.hash(user.password)
-        _user = User(name=user.name,
-                     email=user.email,
-                     role_id=user.role_id,
-                     password=hashed_password)
-        self.db.add(_user)
-        self.db.commit()
-        self.db.refresh(_user)
-        return UserResp.model_validate(_user)
+    async def create_user(self,user:UserSch) -> UserResp:
+        hashed_password = await hash_password(user.password)
+        result = await self.db.execute(insert(User)
+                                       .values(name=user.name,
+                                               email=user.email,
+                                               role_id=user.role_id,
+                                               password=hashed_password)
+                                       .returning(*USER_COLUMNS))
+        _user = UserResp.model_validate(result.one())
+        await self.db.commit()
+        return _user
     
     
     # changue password
-    def change_password(self, user_id: int, password: str) -> UserResp:
-        _user = self.db.query(User).filter(User.id == user_id).first()
-        if not _user:
-            raise NoResultFound
-        _user.password = bcryptContext.hash(password)
-        self.db.commit()
-        self.db.refresh(_user)
-        return UserResp.model_validate(_user)
+    async def change_password(self, user_id: int, password: str) -> UserResp:
+        return await self._update(user_id, password=await hash_password(password))
     
     
     # changue email
-    def change_email(self, user_id: int, email: str) -> UserResp:
-        _user = self.db.query(User).filter(User.id == user_id).first()
-        if not _user:
-            raise NoResultFound
-        _user.email = email
-        self.db.commit()
-        self.db.refresh(_user)
-        return UserResp.model_validate(_user)
+    async def change_email(self, user_id: int, email: str) -> UserResp:
+        return await self._update(user_id, email=email)
         
         
     # delete user
-    def delete_user(self, user_id: int) -> str:
-        _user = self.db.query(User).filter(User.id == user_id).first()
-        if not _user:
+    async def delete_user(self, user_id: int) -> str:
+        # detach the user's courses and payments in the same statement, as the ORM delete did
+        detach_courses = update(Course).where(Course.teacher_id == user_id).values(teacher_id=None).cte("detach_courses")
+        detach_payments = update(Payment).where(Payment.user_id == user_id).values(user_id=None).cte("detach_payments")
+        result = await self.db.execute(delete(User)
+                                       .where(User.id == user_id)
+                                       .add_cte(detach_courses)
+                                       .add_cte(detach_payments)
+                                       .returning(User.id))
+        if result.scalar_one_or_none() is None:
             raise NoResultFound
-        self.db.delete(_user)
-        self.db.commit()
+        await self.db.commit()
+        invalidate_user(user_id)
         return f"User with id {user_id} deleted"
     
     # update user
-    def update_user(self, user_id: int, user: UserResp) -> UserResp:
-        _user = self.db.query(User).filter(User.id == user_id).first()
-        if not _user:
+    async def update_user(self, user_id: int, user: UserResp) -> UserResp:
+        return await self._update(user_id, name=user.name, email=user.email, role_id=user.role_id)
+    
+    
+    # UPDATE ... RETURNING, so a missing user is found out by the write itself
+    async def _update(self, user_id: int, **values) -> UserResp:
+        result = await self.db.execute(update(User).where(User.id == user_id).values(**values).returning(*USER_COLUMNS))
+        _user = result.one_or_none()
+        if _user is None:
             raise NoResultFound
-        _user.name = user.name
-        _user.email = user.email
-        _user.role_id = user.role_id
-        self.db.commit()
-        self.db.refresh(_user)
+        await self.db.commit()
+        invalidate_user(user_id)
         return UserResp.model_validate(_user)
     
     
     # authenticate user
-    def auth_user(self, password: str, username: str) -> UserResp: 
-        _user = self.db.query(User).filter(User.name == username).first()
+    async def auth_user(self, password: str, username: str) -> UserResp: 
+        result = await self.db.execute(select(User).where(User.name == username))
+        _user = result.scalars().first()
         if not _user:
             raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid username or password"
         )
-        if not bcryptContext.verify(password, _user.password):
+        if not await verify_password(password, _user.password):
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid Credentials")
         return UserResp.model_validate(_user)
         
@@ -117,18 +171,30 @@ class UserServ():
     # create acces token
     def create_token(self, user_id: int, username: str, roles: List[int], email: str,expires_delta: timedelta) -> str:
         to_encode = {'sub': username, 'id': user_id,'roles': roles, 'email': email}
-        expire = datetime.utcnow() + expires_delta
-        to_encode.update({'exp': expire})
+        issued_at = datetime.utcnow()
+        expire = issued_at + expires_delta
+        to_encode.update({'exp': expire, 'iat': issued_at})
         encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITH)
         return encoded_jwt
     
 
 # get current user
-def get_current_user(user_service:Annotated[UserServ,Depends()],token: Annotated[str,Depends(oauth_bearer)]) -> UserResp:
-        payload = jwt.decode(token,SECRET_KEY)
+async def get_current_user(user_service:Annotated[UserServ,Depends()],token: Annotated[str,Depends(oauth_bearer)]) -> UserResp:
+        payload = jwt.decode(token,SECRET_KEY,algorithms=[ALGORITH])
         user_id: int = payload.get('id')
-        user = user_service.get_user(user_id=user_id)
+        changed_at = stale_claims.get(user_id)
+        if STATELESS_AUTH and (changed_at is None or payload.get('iat', 0) > changed_at):
+            try:
+                return UserResp(id=user_id, name=payload['sub'], email=payload['email'], role_id=payload['roles'])
+            except (KeyError, ValidationError):
+                pass
+        user = user_cache.get(user_id)
+        if user is None:
+            # a token can outlive its user
+            user = await user_service.find_user(user_id=user_id)
+            if user is not None:
+                user_cache.set(user_id, user)
         if user is None:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
                                     detail="Could not validate user.")
-        return UserResp.model_validate(user)
\ No newline at end of file
+        return user
@@ -0,0 +1,81 @@
+from datetime import date
+import uuid
+import pytest
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+from model.course import Course
+from model.dailyStats import CourseDailyStats, TeacherDailyStats
+from model.payment import Payment, PaymentStatus
+from model.user import User
+from model.userCourse import UserCourse
+from schema.dashboardSch import DashboardFilter
+from schema.userSch import UserResp
+from service.dashboardServ import DashboardServ
+
+pytestmark = pytest.mark.anyio
+
+COURSES = 6
+ENROLLED = 2
+
+
+# DashboardServ runs its queries on separate connections at the same time, which
+# the rolled-back test transaction can't offer: the seed is committed, then deleted
+@pytest.fixture
+async def seeded(db_connection):
+    engine = create_async_engine(db_connection.engine.url, poolclass=NullPool)
+    sessionmaker = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    run = uuid.uuid4().hex[:8]
+    async with sessionmaker() as db:
+        users = (await db.execute(insert(User).returning(User.id, User.name, User.email, User.role_id), [
+            {"name": f"dashboard_student_{run}", "email": f"student_{run}@dashboard.test", "password": "x", "role_id": [2]},
+            {"name": f"dashboard_teacher_{run}", "email": f"teacher_{run}@dashboard.test", "password": "x", "role_id": [3]},
+        ])).all()
+        student, teacher = (UserResp.model_validate(user) for user in users)
+        course_ids = (await db.execute(insert(Course).returning(Course.id), [
+            {"title": f"Dashboard {index}", "description": "", "price": 10, "category": f"dashboard_{run}",
+             "start_date": date(2025, 1, 1), "end_date": date(2025, 12, 31), "teacher_id": teacher.id, "video_url": ""}
+            for index in range(COURSES)])).scalars().all()
+        await db.execute(insert(Payment), [
+            {"user_id": student.id, "course_id": course_id, "amount": 10, "status": PaymentStatus.completed}
+            for course_id in course_ids[:ENROLLED]])
+        await db.commit()
+    try:
+        yield sessionmaker, student, teacher, f"dashboard_{run}", course_ids
+    finally:
+        async with sessionmaker() as db:
+            await db.execute(delete(Payment).where(Payment.course_id.in_(course_ids)))
+            await db.execute(delete(UserCourse).where(UserCourse.course_id.in_(course_ids)))
+            await db.execute(delete(CourseDailyStats).where(CourseDailyStats.course_id.in_(course_ids)))
+            await db.execute(delete(TeacherDailyStats).where(TeacherDailyStats.teacher_id == teacher.id))
+            await db.execute(delete(Course).where(Course.id.in_(course_ids)))
+            await db.execute(delete(User).where(User.id.in_([student.id, teacher.id])))
+            await db.commit()
+        await engine.dispose()
+
+
+async def test_student_dashboard_has_no_catalog(seeded):
+    sessionmaker, student, _, category, _ = seeded
+
+    dashboard = await DashboardServ(sessionmaker).get_dashboard(student, DashboardFilter(category=category, recommendations=3))
+
+    assert dashboard.courses is None and dashboard.next_cursor is None
+    assert dashboard.enrolled_count == ENROLLED
+    assert len(dashboard.recommendations) == 3
+
+
+async def test_teacher_dashboard_includes_the_catalog(seeded):
+    sessionmaker, _, teacher, category, course_ids = seeded
+
+    dashboard = await DashboardServ(sessionmaker).get_dashboard(teacher, DashboardFilter(category=category, limit=4,
+                                                                                           recommendations=3))
+
+    assert [course.id for course in dashboard.courses] == sorted(course_ids)[:4]
+    assert dashboard.next_cursor is not None
+    assert dashboard.enrolled_count == 0
+    # each concurrent session returned its own, complete result
+    recommended = [course.id for course in dashboard.recommendations]
+    assert len(set(recommended)) == 3
+    async with sessionmaker() as db:
+        existing = (await db.execute(select(Course.id).where(Course.id.in_(recommended)))).scalars().all()
+    assert sorted(existing) == sorted(recommended)
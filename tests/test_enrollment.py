@@ -0,0 +1,81 @@
+from datetime import date
+import pytest
+from sqlalchemy import func, insert, select, update
+from model.course import Course
+from model.dailyStats import CourseDailyStats
+from model.payment import Payment, PaymentStatus
+from model.user import User
+from model.userCourse import UserCourse
+
+pytestmark = pytest.mark.anyio
+
+
+async def create_course(db) -> int:
+    return (await db.execute(insert(Course).values(title="Enrollment course", description="", price=10, category="enrollment",
+                                                   start_date=date(2025, 1, 1), end_date=date(2025, 12, 31),
+                                                   video_url="").returning(Course.id))).scalar_one()
+
+
+async def create_user(db) -> int:
+    return (await db.execute(insert(User).values(name="enrollment_user", email="user@enrollment.test",
+                                                 password="x", role_id=[2]).returning(User.id))).scalar_one()
+
+
+async def course_totals(db, course_id: int) -> tuple:
+    return (await db.execute(select(func.coalesce(func.sum(CourseDailyStats.revenue), 0),
+                                    func.coalesce(func.sum(CourseDailyStats.payments), 0),
+                                    func.coalesce(func.sum(CourseDailyStats.enrollments), 0))
+                             .where(CourseDailyStats.course_id == course_id))).one()
+
+
+async def test_completing_payments_enrolls_and_skips_detached_ones(db):
+    course_id = await create_course(db)
+    user_id = await create_user(db)
+    # the second payment lost its user to a delete, the third its course
+    payment_ids = (await db.execute(insert(Payment).returning(Payment.id), [
+        {"user_id": user_id, "course_id": course_id, "amount": 10, "status": PaymentStatus.pending},
+        {"user_id": None, "course_id": course_id, "amount": 10, "status": PaymentStatus.pending},
+        {"user_id": user_id, "course_id": None, "amount": 10, "status": PaymentStatus.pending},
+    ])).scalars().all()
+
+    await db.execute(update(Payment).where(Payment.id.in_(payment_ids)).values(status=PaymentStatus.completed))
+
+    enrolled = (await db.execute(select(UserCourse.user_id, UserCourse.course_id)
+                                 .where(UserCourse.course_id == course_id))).all()
+    assert enrolled == [(user_id, course_id)]
+
+
+async def test_inserting_a_detached_completed_payment_does_not_fail(db):
+    course_id = await create_course(db)
+
+    await db.execute(insert(Payment).values(user_id=None, course_id=course_id, amount=10, status=PaymentStatus.completed))
+
+    assert (await db.execute(select(func.count()).select_from(UserCourse)
+                             .where(UserCourse.course_id == course_id))).scalar_one() == 0
+
+
+async def test_failing_a_completed_payment_reverses_its_rollup(db):
+    course_id = await create_course(db)
+    user_id = await create_user(db)
+    payment_id = (await db.execute(insert(Payment).values(user_id=user_id, course_id=course_id, amount=10,
+                                                          status=PaymentStatus.pending).returning(Payment.id))).scalar_one()
+
+    await db.execute(update(Payment).where(Payment.id == payment_id).values(status=PaymentStatus.completed))
+    assert await course_totals(db, course_id) == (10, 1, 1)
+
+    await db.execute(update(Payment).where(Payment.id == payment_id).values(status=PaymentStatus.failed))
+    assert await course_totals(db, course_id) == (0, 0, 0)
+
+
+async def test_existing_enrollment_counts_on_first_completed_payment(db):
+    course_id = await create_course(db)
+    user_id = await create_user(db)
+    # enrolled by hand, before any payment; rebuildRollups still counts the pair
+    await db.execute(insert(UserCourse).values(user_id=user_id, course_id=course_id))
+
+    await db.execute(insert(Payment), [
+        {"user_id": user_id, "course_id": course_id, "amount": 10, "status": PaymentStatus.completed},
+        {"user_id": user_id, "course_id": course_id, "amount": 10, "status": PaymentStatus.completed},
+    ])
+
+    assert await course_totals(db, course_id) == (20, 2, 1)
@@ -0,0 +1,51 @@
+import pytest
+from sqlalchemy import func, select
+from model.outbox import OutboxMessage, OutboxStatus
+from service import outbox
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def dispatcher_sessions(sessionlocal, monkeypatch):
+    monkeypatch.setattr(outbox, "async_sessionlocal", sessionlocal)
+    monkeypatch.setattr(outbox, "handlers", {})
+
+
+async def enqueue(db, kind: str) -> int:
+    message = outbox.enqueue(db, kind, {"value": 1})
+    await db.commit()
+    return message.id
+
+
+async def test_handler_runs_outside_a_transaction(db, dispatcher_sessions):
+    seen = []
+
+    async def handler(session, payload):
+        seen.append(session.in_transaction())
+
+    outbox.register("test.outside", handler)
+    message_id = await enqueue(db, "test.outside")
+
+    assert await outbox.dispatch_batch() == 1
+    assert seen == [False]
+    message = (await db.execute(select(OutboxMessage).where(OutboxMessage.id == message_id))).scalar_one()
+    await db.refresh(message)
+    assert message.status == OutboxStatus.done and message.attempts == 1
+
+
+async def test_failed_message_is_retried_later(db, dispatcher_sessions):
+    async def handler(session, payload):
+        raise RuntimeError("stripe is down")
+
+    outbox.register("test.failing", handler)
+    message_id = await enqueue(db, "test.failing")
+
+    assert await outbox.dispatch_batch() == 1
+    message = (await db.execute(select(OutboxMessage).where(OutboxMessage.id == message_id))).scalar_one()
+    await db.refresh(message)
+    assert message.status == OutboxStatus.pending
+    assert message.last_error == "stripe is down"
+    assert message.available_at > (await db.execute(select(func.localtimestamp()))).scalar_one()
+    # not due yet, so the next round leaves it alone
+    assert await outbox.dispatch_batch() == 0
@@ -0,0 +1,65 @@
+from datetime import date, timedelta
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import insert, select, update
+from model.course import Course
+from model.idempotencyKey import IdempotencyKey
+from model.payment import Payment, PaymentStatus
+from model.user import User
+from schema.paymentSch import PaymentFilter
+from service.paymentServ import IDEMPOTENCY_LEASE, PaymentService
+from service.userServ import UserServ
+
+pytestmark = pytest.mark.anyio
+
+
+async def create_user(db) -> int:
+    return (await db.execute(insert(User).values(name="idempotency_user", email="user@idempotency.test",
+                                                 password="x", role_id=[2]).returning(User.id))).scalar_one()
+
+
+async def test_claim_in_progress_is_a_conflict(db):
+    user_id = await create_user(db)
+    service = PaymentService(db)
+    assert await service._claim_idempotency_key(user_id, "key", "hash") is None
+
+    with pytest.raises(HTTPException) as error:
+        await service._claim_idempotency_key(user_id, "key", "hash")
+    assert error.value.status_code == 409
+
+
+async def test_abandoned_claim_is_taken_over(db):
+    user_id = await create_user(db)
+    service = PaymentService(db)
+    await service._claim_idempotency_key(user_id, "key", "hash")
+    await db.execute(update(IdempotencyKey)
+                     .where(IdempotencyKey.user_id == user_id)
+                     .values(created_at=IdempotencyKey.created_at - IDEMPOTENCY_LEASE - timedelta(seconds=1)))
+
+    with pytest.raises(HTTPException) as error:
+        await service._claim_idempotency_key(user_id, "key", "other hash")
+    assert error.value.status_code == 422
+    assert await service._claim_idempotency_key(user_id, "key", "hash") is None
+
+
+async def test_deleting_a_user_removes_their_keys(db):
+    user_id = await create_user(db)
+    await PaymentService(db)._claim_idempotency_key(user_id, "key", "hash")
+
+    await UserServ(db).delete_user(user_id)
+
+    assert (await db.execute(select(IdempotencyKey).where(IdempotencyKey.user_id == user_id))).first() is None
+
+
+async def test_payments_of_a_deleted_user_are_still_listed(db):
+    user_id = await create_user(db)
+    course_id = (await db.execute(insert(Course).values(title="Payment course", description="", price=10, category="payment",
+                                                        start_date=date(2025, 1, 1), end_date=date(2025, 12, 31),
+                                                        video_url="").returning(Course.id))).scalar_one()
+    payment_id = (await db.execute(insert(Payment).values(user_id=user_id, course_id=course_id, amount=10,
+                                                          status=PaymentStatus.pending).returning(Payment.id))).scalar_one()
+
+    await UserServ(db).delete_user(user_id)
+
+    page = await PaymentService(db).get_payments(PaymentFilter(course_id=course_id))
+    assert [(payment.id, payment.user_id) for payment in page.items] == [(payment_id, None)]
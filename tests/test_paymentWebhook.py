@@ -0,0 +1,64 @@
+from datetime import date
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import insert, select, update
+from model.course import Course
+from model.payment import Payment, PaymentStatus
+from model.stripeEvent import StripeEvent
+from model.user import User
+from service import paymentServ, paymentWebhook
+from service.paymentWebhook import PaymentEvent, apply_batch, parked_events
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def payment_id(db, sessionlocal, monkeypatch) -> int:
+    monkeypatch.setattr(paymentWebhook, "async_sessionlocal", sessionlocal)
+    user_id = (await db.execute(insert(User).values(name="webhook_user", email="user@webhook.test",
+                                                    password="x", role_id=[2]).returning(User.id))).scalar_one()
+    course_id = (await db.execute(insert(Course).values(title="Webhook course", description="", price=10, category="webhook",
+                                                        start_date=date(2025, 1, 1), end_date=date(2025, 12, 31),
+                                                        teacher_id=user_id, video_url="").returning(Course.id))).scalar_one()
+    # pending, and the outbox has not stored the intent id yet
+    return (await db.execute(insert(Payment).values(user_id=user_id, course_id=course_id, amount=10,
+                                                    status=PaymentStatus.pending).returning(Payment.id))).scalar_one()
+
+
+async def payment_status(db, payment_id: int) -> PaymentStatus:
+    return (await db.execute(select(Payment.status).where(Payment.id == payment_id))).scalar_one()
+
+
+async def test_event_before_the_intent_id_is_parked_then_applied(db, payment_id):
+    event = PaymentEvent(event_id="evt_early", type="payment_intent.succeeded", payment_intent_id="pi_early")
+
+    assert await apply_batch([event]) == 0
+    parked = (await db.execute(select(StripeEvent).where(StripeEvent.event_id == "evt_early"))).scalar_one()
+    assert parked.applied_at is None and parked.attempts == 1
+    assert await payment_status(db, payment_id) == PaymentStatus.pending
+
+    await db.execute(update(Payment).where(Payment.id == payment_id).values(stripe_payment_intent_id="pi_early"))
+    assert await apply_batch(await parked_events()) == 1
+    assert await payment_status(db, payment_id) == PaymentStatus.completed
+
+
+async def test_event_matches_by_payment_id_metadata(db, payment_id):
+    event = PaymentEvent(event_id="evt_meta", type="payment_intent.succeeded", payment_intent_id="pi_meta",
+                         payment_id=payment_id)
+
+    assert await apply_batch([event]) == 1
+    # a redelivery of an applied event changes nothing
+    assert await apply_batch([event]) == 0
+    assert await payment_status(db, payment_id) == PaymentStatus.completed
+
+
+async def test_missing_secret_disables_webhooks_only(monkeypatch):
+    monkeypatch.setattr(paymentWebhook, "STRIPE_WEBHOOK_SECRET", None)
+    monkeypatch.setattr(paymentServ, "STRIPE_WEBHOOK_SECRET", None)
+
+    paymentWebhook.start_worker()
+    assert paymentWebhook.worker_task is None
+
+    with pytest.raises(HTTPException) as error:
+        paymentServ.PaymentService.enqueue_webhook(b"{}", "signature")
+    assert error.value.status_code == 503
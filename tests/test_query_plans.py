@@ -0,0 +1,120 @@
+# query plan checks for the hot service queries.
+#
+# Seeds a dataset large enough for the planner to prefer the indexes, runs
+# EXPLAIN on the queries the services issue on every login / page view and
+# fails when one of them falls back to a sequential scan on a seeded table,
+# e.g. because a migration dropped an index. Everything is rolled back.
+from datetime import datetime
+import pytest
+from sqlalchemy import func, select, text
+from sqlalchemy.dialects import postgresql
+from model.course import Course
+from model.payment import Payment, PaymentStatus
+from model.user import User
+from model.userCourse import UserCourse
+from service.paymentServ import RECENT_PAYMENTS_WINDOW
+
+USERS = 20000
+COURSES = 5000
+PER_USER = 10
+SEEDED_TABLES = {"users", "courses", "payment", "usercourse"}
+
+
+def seed(connection, users: int, courses: int, per_user: int) -> None:
+    connection.execute(text("""
+        INSERT INTO users (name, email, password, role_id)
+        SELECT 'plans_user_' || g, 'plans_user_' || g || '@plans.test', 'x', ARRAY[2]
+        FROM generate_series(1, :users) g
+    """), {"users": users})
+    connection.execute(text("""
+        INSERT INTO courses (title, description, price, category, start_date, end_date, teacher_id, video_url)
+        SELECT 'Plans course ' || g, 'Seeded course ' || g, (g % 200) + 0.99, 'category_' || (g % 100),
+               date '2024-01-01' + (g % 365), date '2025-01-01' + (g % 365), t.id, 'plans.test'
+        FROM generate_series(1, :courses) g
+        JOIN (SELECT id, row_number() OVER (ORDER BY id) - 1 AS rn FROM users WHERE email LIKE '%@plans.test') t
+          ON t.rn = g % 1000
+    """), {"courses": courses})
+    # every user buys per_user distinct courses spread over the whole catalog
+    connection.execute(text("SELECT create_payment_partitions(localtimestamp - make_interval(days => :days), 0)"),
+                       {"days": per_user})
+    connection.execute(text("""
+        INSERT INTO payment (user_id, course_id, amount, payment_date, payment_method, status)
+        SELECT u.id, c.id, 19.99, now() - (j || ' days')::interval, 'stripe', 'completed'
+        FROM (SELECT id, row_number() OVER (ORDER BY id) AS rn FROM users WHERE email LIKE '%@plans.test') u
+        CROSS JOIN generate_series(0, :per_user - 1) j
+        JOIN (SELECT id, row_number() OVER (ORDER BY id) - 1 AS rn FROM courses WHERE video_url = 'plans.test') c
+          ON c.rn = (u.rn * 31 + j) % :courses
+    """), {"courses": courses, "per_user": per_user})
+    for table in SEEDED_TABLES:
+        connection.execute(text(f"ANALYZE {table}"))
+
+
+def sample(connection) -> dict:
+    row = connection.execute(text("""
+        SELECT u.id, u.name, u.email, p.course_id, c.category, c.teacher_id
+        FROM users u JOIN payment p ON p.user_id = u.id JOIN courses c ON c.id = p.course_id
+        WHERE u.email LIKE '%@plans.test' LIMIT 1
+    """)).one()
+    return {**row._mapping, "recent_from": datetime.now() - RECENT_PAYMENTS_WINDOW}
+
+
+# the statements below mirror the ones built in service/*.py
+def hot_queries(s: dict) -> dict:
+    completed = select(Payment.id).where(Payment.user_id == UserCourse.user_id,
+                                         Payment.course_id == UserCourse.course_id,
+                                         Payment.status == PaymentStatus.completed).exists()
+    return {
+        "UserServ.auth_user": select(User).where(User.name == s["name"]),
+        "UserServ.get_user": select(User).where(User.id == s["id"]),
+        "users by email": select(User).where(User.email == s["email"]),
+        "CourseServ.get_user_courses": select(Course)
+            .join(UserCourse, UserCourse.course_id == Course.id)
+            .where(UserCourse.user_id == s["id"], completed)
+            .order_by(Course.id),
+        "CourseServ.get_all by teacher": select(Course).where(Course.teacher_id == s["teacher_id"]).order_by(Course.id).limit(51),
+        "CourseServ.get_all by category": select(Course).where(Course.category == s["category"]).order_by(Course.id).limit(51),
+        "UserCourseServ.get_user_courses": select(UserCourse).where(UserCourse.user_id == s["id"]),
+        "UserCourseServ.count_user_courses": select(func.count()).select_from(UserCourse).where(UserCourse.user_id == s["id"]),
+        "usercourse by course": select(UserCourse).where(UserCourse.course_id == s["course_id"]),
+        "payments by user": select(Payment).where(Payment.user_id == s["id"]),
+        "payments by course": select(Payment).where(Payment.course_id == s["course_id"]),
+        "PaymentService.get_payments by user, recent": select(Payment)
+            .where(Payment.user_id == s["id"], Payment.payment_date >= s["recent_from"])
+            .order_by(Payment.payment_date.desc(), Payment.id.desc()).limit(51),
+    }
+
+
+# seeded relation -> table; payment is scanned through its monthly partitions,
+# and only the ones holding seeded rows count (empty ones are seq scanned for free)
+def seeded_relations(connection) -> dict:
+    relations = {table: table for table in SEEDED_TABLES}
+    for partition in connection.execute(text("SELECT DISTINCT tableoid::regclass::text FROM payment")).scalars():
+        relations[partition] = "payment"
+    return relations
+
+
+def seq_scans(plan: dict, relations: dict) -> list:
+    found = []
+    if plan.get("Node Type") == "Seq Scan" and plan.get("Relation Name") in relations:
+        found.append(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        found.extend(seq_scans(child, relations))
+    return found
+
+
+@pytest.fixture(scope="module")
+def seeded_connection(sync_connection):
+    seed(sync_connection, USERS, COURSES, PER_USER)
+    return sync_connection
+
+
+def test_hot_queries_use_indexes(seeded_connection):
+    relations = seeded_relations(seeded_connection)
+    failures = {}
+    for name, statement in hot_queries(sample(seeded_connection)).items():
+        sql = str(statement.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+        plan = seeded_connection.execute(text("EXPLAIN (FORMAT JSON) " + sql)).scalar_one()[0]["Plan"]
+        scans = seq_scans(plan, relations)
+        if scans:
+            failures[name] = scans
+    assert not failures, f"sequential scans on seeded tables: {failures}"
@@ -0,0 +1,24 @@
+from datetime import timedelta
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import insert
+from model.user import User
+from service import userServ
+from service.userServ import UserServ, get_current_user
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_token_of_a_deleted_user_is_rejected(db, monkeypatch):
+    monkeypatch.setattr(userServ, "SECRET_KEY", "test secret")
+    monkeypatch.setattr(userServ, "ALGORITH", "HS256")
+    service = UserServ(db)
+    user_id = (await db.execute(insert(User).values(name="deleted_user", email="user@deleted.test",
+                                                    password="x", role_id=[2]).returning(User.id))).scalar_one()
+    token = service.create_token(user_id, "deleted_user", [2], "user@deleted.test", timedelta(minutes=5))
+
+    await service.delete_user(user_id)
+
+    with pytest.raises(HTTPException) as error:
+        await get_current_user(service, token)
+    assert error.value.status_code == 401